@@ -2,8 +2,29 @@
 Compute Google Scholar metrics from Excel file.
 """
 import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
-from typing import Dict, Any
+from typing import Dict, Any, List
+from disk_cache import JsonTTLCache
+from excel_stream import write_sheets
+
+# Worker processes used for profile extraction, which is CPU bound in page rendering
+MAX_WORKERS = min(8, os.cpu_count() or 1)
+
+# Extracted metrics are reused across runs for a day
+CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "scholar_metrics.json")
+CACHE_TTL = 24 * 60 * 60
+
+# Accepted header spellings for each output column, in priority order
+COLUMN_CANDIDATES = {
+    "Name": ["faculty name", "faculty", "name"],
+    "Department": ["department name", "department", "dept"],
+    "Profile URL": ["urls", "profile url", "url"],
+}
+
+# Columns of the generated metrics sheet
+OUTPUT_COLUMNS = ["Name", "Department", "Total Citations", "h-index", "i10-index", "Profile URL", "Status"]
 
 def extract_metrics_from_url(url: str) -> Dict[str, Any]:
     """
@@ -21,30 +42,48 @@ def extract_metrics_from_url(url: str) -> Dict[str, Any]:
         "i10_index": metrics["i10_index"]
     }
 
+def _init_worker() -> None:
+    """
+    Import the extraction backend once per worker process instead of per call.
+    """
+    try:
+        import standalone_extract  # noqa: F401
+    except ImportError:
+        # Surface the import error per row from extract_metrics_from_url instead
+        pass
+
+def _fetch_all_metrics(urls: List[str]) -> List[Any]:
+    """
+    Extract metrics for every URL concurrently.
+    
+    Extractions run in a pool of worker processes so rendering and parsing are
+    not serialized by the GIL. Failed extractions are returned as exception
+    objects in place of metrics. This is a plain blocking call, so async
+    callers can run it with asyncio.to_thread.
+    """
+    if not urls:
+        return []
+    
+    with ProcessPoolExecutor(max_workers=MAX_WORKERS, initializer=_init_worker) as pool:
+        futures = [pool.submit(extract_metrics_from_url, url) for url in urls]
+    return [future.exception() or future.result() for future in futures]
+
 def compute_scholar_metrics(input_path: str, output_path: str, preview_rows: int = 10) -> Dict[str, Any]:
     """
     Compute Google Scholar metrics from Excel file.
     """
     # Read Excel file
-    df = pd.read_excel(input_path, header=1)
-    clean_cols = {col: col.strip() for col in df.columns}
-    df.rename(columns=clean_cols, inplace=True)
-    lower_map = {col.lower(): col for col in df.columns}
+    df = pd.read_excel(input_path, header=1, dtype=str, engine="openpyxl")
+    df.columns = df.columns.astype(str).str.strip()
+    lower = df.columns.str.lower()
     renames = {}
     
     # Find column names
-    for key in ["faculty name", "faculty", "name"]:
-        if key in lower_map:
-            renames[lower_map[key]] = "Name"
-            break
-    for key in ["department name", "department", "dept"]:
-        if key in lower_map:
-            renames[lower_map[key]] = "Department"
-            break
-    for key in ["urls", "profile url", "url"]:
-        if key in lower_map:
-            renames[lower_map[key]] = "Profile URL"
-            break
+    for target, candidates in COLUMN_CANDIDATES.items():
+        hits = np.isin(candidates, lower)
+        if hits.any():
+            match = candidates[np.argmax(hits)]
+            renames[df.columns[np.argmax(lower == match)]] = target
     
     # Rename columns
     df.rename(columns=renames, inplace=True)
@@ -58,47 +97,71 @@ def compute_scholar_metrics(input_path: str, output_path: str, preview_rows: int
     if "Profile URL" not in df.columns:
         raise Exception("Input Excel must have a 'URLs' column with Google Scholar profile links.")
     
-    # Process each row
+    # Rows with a missing or blank URL are errors; they are never fetched or cached
+    urls = df["Profile URL"].fillna("").str.strip().tolist()
+    missing_url = ValueError("Missing profile URL")
+    
+    # Serve rows from the cache where possible
+    cache = JsonTTLCache(CACHE_FILE, CACHE_TTL)
+    fetched = [cache.get(url) if url else missing_url for url in urls]
+    pending = [i for i, metrics in enumerate(fetched) if metrics is None]
+    cache_hits = sum(1 for url, metrics in zip(urls, fetched) if url and metrics is not None)
+    
+    # Fetch metrics concurrently, once per distinct URL among the remaining rows
+    unique_urls = list(dict.fromkeys(urls[i] for i in pending))
+    fresh = dict(zip(unique_urls, _fetch_all_metrics(unique_urls)))
+    for url, metrics in fresh.items():
+        if not isinstance(metrics, Exception):
+            cache.set(url, metrics)
+    for i in pending:
+        fetched[i] = fresh[urls[i]]
+    cache.save()
+    
+    # Process each row, counting successes as we go
     results = []
-    for name, dept, profile_url in zip(df["Name"], df["Department"], df["Profile URL"]):
-        try:
-            # Extract metrics
-            metrics = extract_metrics_from_url(profile_url)
-            
-            # Add to results
+    success_count = 0
+    for name, dept, profile_url, metrics in zip(df["Name"], df["Department"], df["Profile URL"], fetched):
+        if isinstance(metrics, Exception):
+            # Handle errors
             results.append({
                 "Name": name,
                 "Department": dept,
-                "Total Citations": metrics["citations"],
-                "h-index": metrics["h_index"],
-                "i10-index": metrics["i10_index"],
+                "Total Citations": 0,
+                "h-index": 0,
+                "i10-index": 0,
                 "Profile URL": profile_url,
-                "Status": "Success"
+                "Status": f"Error: {metrics}"
             })
-        except Exception as e:
-            # Handle errors
+        else:
+            # Add to results
+            success_count += 1
             results.append({
                 "Name": name,
                 "Department": dept,
-                "Total Citations": 0,
-                "h-index": 0,
-                "i10-index": 0,
+                "Total Citations": metrics["citations"],
+                "h-index": metrics["h_index"],
+                "i10-index": metrics["i10_index"],
                 "Profile URL": profile_url,
-                "Status": f"Error: {e}"
+                "Status": "Success"
             })
     
     # Create output DataFrame
-    out_df = pd.DataFrame(results)
+    out_df = pd.DataFrame(results, columns=OUTPUT_COLUMNS)
+    
+    # Department and Status repeat heavily, so store them as categoricals
+    out_df["Department"] = out_df["Department"].astype("category")
+    out_df["Status"] = out_df["Status"].astype("category")
     
     # Save to Excel
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    out_df.to_excel(output_path, index=False)
+    write_sheets(output_path, {"Sheet1": out_df})
     
     # Return preview
     return {
         "preview": out_df.head(preview_rows).to_dict("records"),
         "total_faculty": len(out_df),
-        "success_count": sum(1 for r in results if r["Status"] == "Success"),
-        "failed_count": sum(1 for r in results if r["Status"] != "Success"),
+        "success_count": success_count,
+        "failed_count": len(results) - success_count,
+        "cache_hits": cache_hits,
         "output_path": output_path
     }
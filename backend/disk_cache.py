@@ -0,0 +1,70 @@
+"""
+JSON-backed TTL cache for persisting slow lookups across runs.
+"""
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+class JsonTTLCache:
+    """
+    Key/value cache persisted to a JSON file, with an expiry time per entry.
+
+    Entries live in memory once loaded; call save() to write them back to disk.
+    Values must be JSON serializable.
+    """
+
+    def __init__(self, path: str, ttl: float):
+        """
+        Args:
+            path: JSON file backing the cache
+            ttl: Default lifetime of an entry in seconds
+        """
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """Read cached entries from disk, ignoring a missing or corrupt file."""
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            return entries if isinstance(entries, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry["expires"] < time.time():
+                del self._entries[key]
+                return None
+            return entry["value"]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store value under key for ttl seconds (defaults to the cache TTL)."""
+        expires = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = {"value": value, "expires": expires}
+
+    def save(self) -> None:
+        """Write unexpired entries to disk atomically."""
+        now = time.time()
+        with self._lock:
+            live = {k: v for k, v in self._entries.items() if v["expires"] >= now}
+            payload = json.dumps(live)
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,33 @@
+"""
+Streaming Excel output for plain tabular sheets.
+"""
+from typing import Dict
+import pandas as pd
+import xlsxwriter
+
+def write_sheets(output_path: str, sheets: Dict[str, pd.DataFrame]) -> None:
+    """
+    Write each DataFrame to its own sheet, streaming rows to disk.
+    
+    Uses xlsxwriter's constant_memory mode, which keeps only the current row
+    in memory. That mode requires rows to be written strictly in order, so
+    rows are emitted here one at a time instead of through DataFrame.to_excel,
+    which writes column by column.
+    
+    Args:
+        output_path: Path for the output Excel file
+        sheets: Mapping of sheet name to the DataFrame written on it
+    """
+    workbook = xlsxwriter.Workbook(output_path, {"constant_memory": True})
+    try:
+        header_format = workbook.add_format({"bold": True, "border": 1, "align": "center"})
+        for sheet_name, df in sheets.items():
+            worksheet = workbook.add_worksheet(sheet_name)
+            worksheet.write_row(0, 0, [str(col) for col in df.columns], header_format)
+            
+            # Missing values become blank cells
+            values = df.astype(object).where(df.notna(), None)
+            for row_num, row in enumerate(values.itertuples(index=False), 1):
+                worksheet.write_row(row_num, 0, row)
+    finally:
+        workbook.close()
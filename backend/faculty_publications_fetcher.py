@@ -1,10 +1,15 @@
+import numpy as np
 import pandas as pd
+import orjson
 import requests
-import time
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import asyncio
 import argparse
 import os
 from dotenv import load_dotenv
 import logging
+from excel_stream import write_sheets
 
 # Load environment variables
 load_dotenv()
@@ -19,163 +24,314 @@ INST_TOKEN = os.getenv("INST_TOKEN", "60106943")  # Your institutional token
 WOS_API_KEY = os.getenv("WOS_API_KEY", "YOUR_WOS_API_KEY")
 
 YEARS = ["2021", "2022", "2023", "2024", "2025"]
-
-def fetch_scopus_pubs(scopus_id, faculty_name, scopus_api_key=None, inst_token=None):
-    """Fetch Scopus publications for a faculty member using institutional token."""
-    pubs_by_year = {year: [] for year in YEARS}
-    
-    if scopus_id == "NA" or pd.isna(scopus_id) or not scopus_id:
-        logger.info(f"Skipping Scopus for {faculty_name} - No Scopus ID provided")
-        return pubs_by_year
-    
-    if not scopus_api_key or scopus_api_key == "YOUR_SCOPUS_API_KEY":
-        logger.info(f"Skipping Scopus for {faculty_name} - No API key configured")
-        return pubs_by_year
-    
-    if not inst_token or inst_token == "YOUR_INST_TOKEN":
-        logger.info(f"Skipping Scopus for {faculty_name} - No institutional token configured")
-        return pubs_by_year
+YEARS_INDEX = np.array(YEARS)  # sorted, for np.searchsorted bucketing
+
+# Scopus: authors combined per OR'd query, and entries per page
+SCOPUS_BATCH_SIZE = 25
+SCOPUS_PAGE_SIZE = 25
+
+# Rate limiting: maximum in-flight requests per API
+SCOPUS_CONCURRENCY = 5
+WOS_CONCURRENCY = 5
+
+# Well-formed author identifiers: Scopus AU-IDs are numeric; WoS accepts a
+# ResearcherID (e.g. A-1234-2010, AAB-1234-2021) or an ORCID. WoS IDs are
+# upper-cased before matching
+SCOPUS_ID_PATTERN = r"\d+"
+WOS_ID_PATTERN = r"[A-Z]{0,4}-?\d+-\d+|\d{4}-\d{4}-\d{4}-\d{3}[\dX]"
+
+def _make_session():
+    """Create a pooled keep-alive session that retries throttled and transient failures."""
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504))
+    session.mount("https://", HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=retry))
+    return session
+
+# One session per API so connections and TLS handshakes are reused across calls
+_scopus_session = _make_session()
+_wos_session = _make_session()
+
+async def _get(limiter, session, url, headers, params):
+    """Run a blocking GET off the event loop while holding the API's limiter slot."""
+    async with limiter:
+        return await asyncio.to_thread(session.get, url, headers=headers, params=params, timeout=30)
+
+def _pubs_frame(titles=(), years=()):
+    """Build a (title, year) DataFrame of publications."""
+    return pd.DataFrame({"title": list(titles), "year": list(years)}, dtype=object)
+
+async def _fetch_scopus_entries(query, label, headers, limiter):
+    """
+    Fetch every entry matching a Scopus query, following cursor pagination.
     
+    Entries are requested in the COMPLETE view, which lists each entry's author
+    IDs but caps pages at 25 entries. Errors end the pagination early and keep
+    the entries fetched so far; label names the query in log messages.
+    """
     base_url = "https://api.elsevier.com/content/search/scopus"
-    api_key = scopus_api_key or SCOPUS_API_KEY
-    token = inst_token or INST_TOKEN
-    
-    if not api_key or api_key == "YOUR_SCOPUS_API_KEY":
-        logger.info(f"Skipping Scopus for {faculty_name} - Invalid API key")
-        return pubs_by_year
-    
-    if not token or token == "YOUR_INST_TOKEN":
-        logger.info(f"Skipping Scopus for {faculty_name} - Invalid institutional token")
-        return pubs_by_year
-    
-    headers = {
-        "Accept": "application/json",
-        "X-ELS-APIKey": api_key,
-        "X-ELS-Insttoken": token
-    }
-    
-    start = 0
-    while True:
+    entries = []
+    cursor = "*"
+    while cursor:
         params = {
-            "query": f"AU-ID({scopus_id})",
-            "count": 25,
-            "start": start,
-            "sort": "pubyear"
+            "query": query,
+            "count": SCOPUS_PAGE_SIZE,
+            "cursor": cursor,
+            "view": "COMPLETE"
         }
         
         try:
-            logger.info(f"Fetching Scopus publications for {faculty_name} (start={start})")
-            resp = requests.get(base_url, headers=headers, params=params, timeout=30)
+            logger.info(f"Fetching Scopus publications for {label}")
+            resp = await _get(limiter, _scopus_session, base_url, headers, params)
             
             if resp.status_code == 403:
-                logger.error(f"403 Forbidden for Scopus {faculty_name} - Skipping further Scopus calls")
+                logger.error(f"403 Forbidden for Scopus {query} - Skipping further Scopus calls")
                 break
             elif resp.status_code != 200:
-                logger.error(f"HTTP {resp.status_code} error for Scopus {faculty_name}")
+                logger.error(f"HTTP {resp.status_code} error for Scopus {query}")
                 break
             
-            data = resp.json()
+            data = orjson.loads(resp.content)
             
             if "search-results" in data and "entry" in data["search-results"]:
-                entries = data["search-results"]["entry"]
-                logger.info(f"Found {len(entries)} Scopus publications for {faculty_name}")
-                
-                for entry in entries:
-                    try:
-                        title = entry.get("dc:title", "Untitled")
-                        cover_date = entry.get("prism:coverDate", "")
-                        
-                        # Extract year from cover date
-                        if cover_date:
-                            year = cover_date.split("-")[0]
-                            if year in pubs_by_year:
-                                pubs_by_year[year].append(title)
-                        
-                    except Exception as e:
-                        logger.error(f"Error parsing Scopus entry for {faculty_name}: {e}")
-                        continue
+                page = data["search-results"]["entry"]
+                logger.info(f"Found {len(page)} Scopus publications for {label}")
+                entries.extend(entry for entry in page if isinstance(entry, dict))
                 
                 # Check if we have more results
-                if len(entries) < 25:
+                if len(page) < SCOPUS_PAGE_SIZE:
                     break
-                start += 25
+                cursor = data["search-results"].get("cursor", {}).get("@next")
             else:
-                logger.info(f"No Scopus publications found for {faculty_name}")
+                logger.info(f"No Scopus publications found for {query}")
                 break
                 
         except requests.exceptions.RequestException as e:
-            logger.error(f"Request error fetching Scopus for {faculty_name}: {e}")
+            logger.error(f"Request error fetching Scopus {query}: {e}")
             break
         except Exception as e:
-            logger.error(f"Unexpected error fetching Scopus for {faculty_name}: {e}")
+            logger.error(f"Unexpected error fetching Scopus {query}: {e}")
             break
-        
-        time.sleep(0.3)  # Rate limiting
     
-    return pubs_by_year
+    return entries
 
-def fetch_wos_pubs(wos_id, faculty_name, wos_api_key=None):
-    """Fetch WoS publications for a faculty member."""
-    pubs_by_year = {year: [] for year in YEARS}
+def _entry_title_year(entry):
+    """Return an entry's title and cover year; Scopus sends null for missing fields."""
+    title = entry.get("dc:title") or "Untitled"
+    year = (entry.get("prism:coverDate") or "")[:4]  # coverDate is YYYY-MM-DD
+    return title, year
+
+async def fetch_scopus_batch(scopus_ids, scopus_api_key, inst_token, *, limiter):
+    """
+    Fetch Scopus publications for several authors with a single OR'd AU-ID query.
+    
+    Returns a (title, year) DataFrame per Scopus ID. Entries are split back to
+    each author by the author IDs the COMPLETE view lists on them. That list is
+    truncated on large-collaboration papers, so if any entry names none of the
+    batched authors, every ID in the batch is re-fetched with its own AU-ID
+    query, which needs no author list. Credentials are assumed valid; main()
+    checks them once before any fetch is scheduled.
+    """
+    headers = {
+        "Accept": "application/json",
+        "X-ELS-APIKey": scopus_api_key,
+        "X-ELS-Insttoken": inst_token
+    }
     
-    if wos_id == "NA" or pd.isna(wos_id) or not wos_id:
-        logger.info(f"Skipping WoS for {faculty_name} - No WoS ID provided")
-        return pubs_by_year
+    wanted = set(scopus_ids)
+    query = " OR ".join(f"AU-ID({scopus_id})" for scopus_id in scopus_ids)
+    entries = await _fetch_scopus_entries(query, f"{len(scopus_ids)} authors", headers, limiter)
     
-    if not wos_api_key or wos_api_key == "YOUR_WOS_API_KEY":
-        logger.info(f"Skipping WoS for {faculty_name} - No API key configured")
-        return pubs_by_year
+    owners = []
+    titles = []
+    years = []
+    unattributed = False
+    for entry in entries:
+        title, year = _entry_title_year(entry)
+        
+        # Credit the entry to every batched author listed on it; a lone author owns every entry
+        if len(wanted) == 1:
+            matched = wanted
+        else:
+            authors = {author.get("authid") for author in (entry.get("author") or []) if isinstance(author, dict)}
+            matched = authors & wanted
+        unattributed |= not matched
+        for scopus_id in matched:
+            owners.append(scopus_id)
+            titles.append(title)
+            years.append(year)
     
-    base_url = "https://api.clarivate.com/apis/wos-starter/v1/documents"
-    api_key = wos_api_key or WOS_API_KEY
+    if unattributed:
+        # Some author list was truncated, so its owner cannot be told apart; query each ID alone
+        logger.info(f"Scopus batch {query} has entries without a batched author ID - Re-fetching per author")
+        per_id = await asyncio.gather(*[
+            _fetch_scopus_entries(f"AU-ID({scopus_id})", f"author {scopus_id}", headers, limiter)
+            for scopus_id in scopus_ids
+        ])
+        owners = []
+        titles = []
+        years = []
+        for scopus_id, author_entries in zip(scopus_ids, per_id):
+            for entry in author_entries:
+                title, year = _entry_title_year(entry)
+                owners.append(scopus_id)
+                titles.append(title)
+                years.append(year)
     
-    if not api_key or api_key == "YOUR_WOS_API_KEY":
-        logger.info(f"Skipping WoS for {faculty_name} - Invalid API key")
-        return pubs_by_year
+    # Split the collected entries per author
+    results = {scopus_id: _pubs_frame() for scopus_id in scopus_ids}
+    frame = pd.DataFrame({"author": owners, "title": titles, "year": years}, dtype=object)
+    for scopus_id, group in frame.groupby("author"):
+        results[scopus_id] = group[["title", "year"]].reset_index(drop=True)
     
-    headers = {
-        "X-ApiKey": api_key,
-        "Content-Type": "application/json"
+    return results
+
+async def _fetch_wos_year(wos_id, faculty_name, year, headers, limiter):
+    """Fetch WoS publication titles for a faculty member in a single year."""
+    base_url = "https://api.clarivate.com/apis/wos-starter/v1/documents"
+    query = f"AI=({wos_id}) AND PY={year}"
+    params = {
+        "q": query,
+        "limit": 25,
+        "offset": 0
     }
+    titles = []
     
-    for year in YEARS:
-        query = f"AI=({wos_id}) AND PY={year}"
-        params = {
-            "q": query,
-            "limit": 25,
-            "offset": 0
-        }
+    try:
+        logger.info(f"Fetching WoS publications for {faculty_name}, year {year}")
+        resp = await _get(limiter, _wos_session, base_url, headers, params)
+        resp.raise_for_status()
         
-        try:
-            logger.info(f"Fetching WoS publications for {faculty_name}, year {year}")
-            resp = requests.get(base_url, headers=headers, params=params, timeout=30)
-            resp.raise_for_status()
+        data = orjson.loads(resp.content)
+        
+        if "hits" in data:
+            records = data["hits"]
+            logger.info(f"Found {len(records)} WoS publications for {faculty_name} in {year}")
             
-            data = resp.json()
+            titles = [record.get("title", "Untitled") for record in records if isinstance(record, dict)]
+        else:
+            logger.info(f"No WoS publications found for {faculty_name} in {year}")
             
-            if "hits" in data:
-                records = data["hits"]
-                logger.info(f"Found {len(records)} WoS publications for {faculty_name} in {year}")
-                
-                for record in records:
-                    try:
-                        title = record.get("title", "Untitled")
-                        pubs_by_year[year].append(title)
-                        
-                    except Exception as e:
-                        logger.error(f"Error parsing WoS record for {faculty_name}, year {year}: {e}")
-                        continue
-            else:
-                logger.info(f"No WoS publications found for {faculty_name} in {year}")
-                
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Request error fetching WoS for {faculty_name}, year {year}: {e}")
-        except Exception as e:
-            logger.error(f"Unexpected error fetching WoS for {faculty_name}, year {year}: {e}")
-        
-        time.sleep(0.3)
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Request error fetching WoS for {faculty_name}, year {year}: {e}")
+    except Exception as e:
+        logger.error(f"Unexpected error fetching WoS for {faculty_name}, year {year}: {e}")
+    
+    return titles
+
+async def fetch_wos_pubs(wos_id, faculty_name, wos_api_key, *, limiter):
+    """
+    Fetch WoS publications for a faculty member.
+    
+    Returns one list of titles per entry in YEARS. wos_id must already match
+    WOS_ID_PATTERN; run_all filters invalid IDs. The API key is assumed valid;
+    main() checks it once up front.
+    """
+    headers = {
+        "X-ApiKey": wos_api_key,
+        "Content-Type": "application/json"
+    }
+    
+    # Query all years concurrently
+    return list(await asyncio.gather(*[
+        _fetch_wos_year(wos_id, faculty_name, year, headers, limiter) for year in YEARS
+    ]))
+
+def _titles_by_year(pubs_df):
+    """Split a (title, year) frame into one list of titles per entry in YEARS."""
+    # Assign each in-range publication to its year bucket in one vectorized sweep
+    years = pubs_df["year"].to_numpy(dtype="<U4")
+    titles = pubs_df["title"].to_numpy(dtype=object)
+    in_range = np.isin(years, YEARS_INDEX)
+    buckets = np.searchsorted(YEARS_INDEX, years[in_range])
+    titles = titles[in_range]
+    return [titles[buckets == b].tolist() for b in range(len(YEARS))]
+
+def _fill_row(mat, i, per_year):
+    """Write newline-joined titles into row i of a result matrix, leaving "-" for empty years."""
+    for j, titles in enumerate(per_year):
+        if len(titles):
+            mat[i, j] = "\n".join(titles)
+
+def _results_frame(names, depts, mat):
+    """Build the output sheet from the name/department columns and a year matrix."""
+    frame = pd.DataFrame(mat, columns=YEARS)
+    frame.insert(0, "Department", depts)
+    frame.insert(0, "FacultyName", names)
+    return frame
+
+def _log_skipped_ids(source, names, ids, valid):
+    """Log each faculty row a source skips for a missing or malformed ID."""
+    for i in np.flatnonzero(~valid):
+        if not ids[i] or ids[i] == "NA":
+            logger.info(f"Skipping {source} for {names[i]} - No {source} ID provided")
+        else:
+            logger.warning(f"Skipping {source} for {names[i]} - Invalid {source} ID {ids[i]!r}")
+
+async def run_all(df, scopus_key, wos_key, inst_token):
+    """
+    Fetch Scopus and WoS publications for every faculty row concurrently.
     
-    return pubs_by_year
+    Returns a (Scopus, WoS) pair of DataFrames with one column per entry in
+    YEARS. Pass None for an unconfigured key or token: a source whose key is
+    None comes back as None, and Scopus rows without a token are reported empty.
+    """
+    scopus_limiter = asyncio.Semaphore(SCOPUS_CONCURRENCY)
+    wos_limiter = asyncio.Semaphore(WOS_CONCURRENCY)
+    
+    names = df["FacultyName"].fillna("").astype(str).str.strip().to_numpy()
+    depts = df["Department"].fillna("").astype(str).str.strip().to_numpy()
+    sids = df["SCOPUS_ID"].fillna("").astype(str).str.strip()
+    wids = df["WOS_ID"].fillna("").astype(str).str.strip().str.upper()
+    
+    # Rows without a well-formed ID never reach the fetchers
+    valid_scopus = sids.str.fullmatch(SCOPUS_ID_PATTERN).to_numpy(dtype=bool)
+    valid_wos = wids.str.fullmatch(WOS_ID_PATTERN).to_numpy(dtype=bool)
+    sids = sids.to_numpy()
+    wids = wids.to_numpy()
+    
+    scopus_enabled = scopus_key is not None
+    wos_enabled = wos_key is not None
+    if scopus_enabled:
+        _log_skipped_ids("Scopus", names, sids, valid_scopus)
+    if wos_enabled:
+        _log_skipped_ids("WoS", names, wids, valid_wos)
+    scopus_rows = np.flatnonzero(valid_scopus) if scopus_enabled and inst_token is not None else np.array([], dtype=int)
+    wos_rows = np.flatnonzero(valid_wos) if wos_enabled else np.array([], dtype=int)
+    logger.info(f"Queueing {len(scopus_rows)} Scopus and {len(wos_rows)} WoS lookups for {len(names)} faculty members")
+    
+    # Scopus IDs are queried in batches of up to SCOPUS_BATCH_SIZE authors
+    scopus_batches = [
+        chunk for chunk in np.array_split(scopus_rows, len(scopus_rows) // SCOPUS_BATCH_SIZE + 1)
+        if chunk.size
+    ]
+    
+    scopus_fetched, wos_fetched = await asyncio.gather(
+        asyncio.gather(*[
+            fetch_scopus_batch([sids[i] for i in chunk], scopus_key, inst_token, limiter=scopus_limiter)
+            for chunk in scopus_batches
+        ]),
+        asyncio.gather(*[
+            fetch_wos_pubs(wids[i], names[i], wos_key, limiter=wos_limiter)
+            for i in wos_rows
+        ])
+    )
+    
+    # One preallocated (faculty x year) matrix per source; rows with nothing stay "-"
+    scopus_mat = np.full((len(names), len(YEARS)), "-", dtype=object)
+    for chunk, by_id in zip(scopus_batches, scopus_fetched):
+        for i in chunk:
+            _fill_row(scopus_mat, i, _titles_by_year(by_id[sids[i]]))
+    wos_mat = np.full((len(names), len(YEARS)), "-", dtype=object)
+    for i, per_year in zip(wos_rows, wos_fetched):
+        _fill_row(wos_mat, i, per_year)
+    
+    scopus_results = _results_frame(names, depts, scopus_mat) if scopus_enabled else None
+    wos_results = _results_frame(names, depts, wos_mat) if wos_enabled else None
+    return scopus_results, wos_results
+
+def _configured(value, placeholder):
+    """Return True if a credential is set to something other than its placeholder."""
+    return bool(value) and value != placeholder
 
 def main():
     parser = argparse.ArgumentParser(description="Fetch faculty publications from Scopus and WoS")
@@ -192,24 +348,28 @@ def main():
     wos_key = args.wos_key or WOS_API_KEY
     inst_token = args.inst_token or INST_TOKEN
     
-    logger.info(f"Scopus API Key: {scopus_key[:10]}..." if scopus_key != "YOUR_SCOPUS_API_KEY" else "Not configured")
-    logger.info(f"WoS API Key: {wos_key[:10]}..." if wos_key != "YOUR_WOS_API_KEY" else "Not configured")
-    logger.info(f"Institutional Token: {inst_token[:10]}..." if inst_token != "YOUR_INST_TOKEN" else "Not configured")
+    # Validate credentials once; fetchers assume whatever they are given is usable
+    scopus_ok = _configured(scopus_key, "YOUR_SCOPUS_API_KEY")
+    wos_ok = _configured(wos_key, "YOUR_WOS_API_KEY")
+    token_ok = _configured(inst_token, "YOUR_INST_TOKEN")
+    
+    logger.info(f"Scopus API Key: {scopus_key[:10]}..." if scopus_ok else "Not configured")
+    logger.info(f"WoS API Key: {wos_key[:10]}..." if wos_ok else "Not configured")
+    logger.info(f"Institutional Token: {inst_token[:10]}..." if token_ok else "Not configured")
     
     # Check if at least one API key is configured
-    if scopus_key == "YOUR_SCOPUS_API_KEY" and wos_key == "YOUR_WOS_API_KEY":
+    if not scopus_ok and not wos_ok:
         logger.error("No API keys configured! Please set SCOPUS_API_KEY and/or WOS_API_KEY in .env file")
         return
     
+    if scopus_ok and not token_ok:
+        logger.info("Skipping Scopus lookups - No institutional token configured")
+    
     try:
-        # Read input Excel file
-        df = pd.read_excel(args.input)
+        # Read only the first 4 columns as text (IDs must not be parsed as numbers)
+        df = pd.read_excel(args.input, usecols="A:D", dtype=str, engine="openpyxl")
         logger.info(f"Loaded {len(df)} faculty members from {args.input}")
         
-        # Handle case where first row might be data instead of headers
-        if len(df.columns) > 4:
-            df = df.iloc[:, :4]  # Take only first 4 columns
-        
         # Map columns to expected names
         df.columns = ["FacultyName", "Department", "SCOPUS_ID", "WOS_ID"]
         
@@ -219,66 +379,26 @@ def main():
         
         logger.info(f"Processing {len(df)} faculty members")
         
-        # Store results
-        scopus_results = []
-        wos_results = []
-        
-        for idx, row in df.iterrows():
-            faculty_name = str(row["FacultyName"]).strip()
-            department = str(row["Department"]).strip()
-            scopus_id = str(row["SCOPUS_ID"]).strip()
-            wos_id = str(row["WOS_ID"]).strip()
-            
-            logger.info(f"Processing {idx+1}/{len(df)}: {faculty_name}")
-            
-            # Fetch Scopus publications
-            if scopus_key != "YOUR_SCOPUS_API_KEY":
-                scopus_pubs = fetch_scopus_pubs(scopus_id, faculty_name, scopus_key, inst_token)
-                
-                # Format Scopus results
-                scopus_entry = {
-                    "FacultyName": faculty_name,
-                    "Department": department
-                }
-                
-                for year in YEARS:
-                    if scopus_pubs[year]:
-                        scopus_entry[year] = "\n".join(scopus_pubs[year])
-                    else:
-                        scopus_entry[year] = "-"
-                
-                scopus_results.append(scopus_entry)
-            
-            # Fetch WoS publications
-            if wos_key != "YOUR_WOS_API_KEY":
-                wos_pubs = fetch_wos_pubs(wos_id, faculty_name, wos_key)
-                
-                # Format WoS results
-                wos_entry = {
-                    "FacultyName": faculty_name,
-                    "Department": department
-                }
-                
-                for year in YEARS:
-                    if wos_pubs[year]:
-                        wos_entry[year] = "\n".join(wos_pubs[year])
-                    else:
-                        wos_entry[year] = "-"
-                
-                wos_results.append(wos_entry)
+        # Fetch publications for all faculty concurrently
+        scopus_results, wos_results = asyncio.run(run_all(
+            df,
+            scopus_key if scopus_ok else None,
+            wos_key if wos_ok else None,
+            inst_token if token_ok else None
+        ))
         
         # Save results to Excel
-        with pd.ExcelWriter(args.output, engine='openpyxl') as writer:
-            if scopus_results:
-                scopus_df = pd.DataFrame(scopus_results)
-            scopus_df.to_excel(writer, sheet_name="Scopus Publications", index=False)
+        sheets = {}
+        if scopus_results is not None and len(scopus_results):
+            sheets["Scopus Publications"] = scopus_results
             logger.info(f"Saved {len(scopus_results)} Scopus records")
-            
-            if wos_results:
-                wos_df = pd.DataFrame(wos_results)
-            wos_df.to_excel(writer, sheet_name="WoS Publications", index=False)
+        
+        if wos_results is not None and len(wos_results):
+            sheets["WoS Publications"] = wos_results
             logger.info(f"Saved {len(wos_results)} WoS records")
         
+        write_sheets(args.output, sheets)
+        
         logger.info(f"✅ Publications saved to {args.output}")
         
     except Exception as e:
@@ -1,29 +1,34 @@
 from fastapi import FastAPI, HTTPException, Depends, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, ORJSONResponse
 from pydantic import BaseModel
-from typing import List, Optional
-import json
+from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict
+import asyncio
+import logging
 import os
-import requests
-from bs4 import BeautifulSoup
+import orjson
 import time
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-import re
+import pickle
+import shutil
+import openpyxl
 import pandas as pd
 from dotenv import load_dotenv
 import uuid
 
 # Import the API modules
-from scholar_api import get_scholar_metrics, test_serpapi_connection
+from scholar_api import extract_scholar_id, get_scholar_metrics, get_scholar_metrics_batch, test_serpapi_connection
+from merge_publications import run_merge
 
 # Load environment variables
 load_dotenv()
+SERPAPI_KEY = os.getenv("SERPAPI_KEY", "")
 
-app = FastAPI(title="Faculty Publications API", version="1.0.0")
+# Configure logging; per-request detail is logged at DEBUG, so the default level keeps it quiet
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING").upper(), format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+app = FastAPI(title="Faculty Publications API", version="1.0.0", default_response_class=ORJSONResponse)
 
 # CORS middleware
 app.add_middleware(
@@ -61,21 +66,78 @@ class ScholarMetricsResponse(BaseModel):
 # In-memory storage (replace with database in production)
 faculty_data = []
 faculty_file = "faculty_data.json"
-generated_outputs = {}
+
+# Lookup indexes over faculty_data, keyed by id and by lowercased name
+faculty_by_id: Dict[str, dict] = {}
+faculty_by_name: Dict[str, dict] = {}
+_next_faculty_id = 1
+
+# Merged workbooks available for download, oldest first: file_id -> (path, created at).
+# Entries and their files are dropped after OUTPUT_TTL seconds or once more than
+# MAX_OUTPUTS are held; stray files in OUTPUT_DIR are swept on the same schedule.
+OUTPUT_DIR = "tmp_out"
+OUTPUT_TTL = 60 * 60
+MAX_OUTPUTS = 256
+OUTPUT_CLEANUP_INTERVAL = 5 * 60
+generated_outputs: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+# Dashboard counts derived from faculty_data; cleared whenever it is saved
+_faculty_counts: Dict[str, int] = {}
+
+# Columns of the merged publications sheet used by the import endpoint
+IMPORT_COLUMNS = ["Author", "Department", "Total_Publications"]
+
+# Uploads are copied to disk in chunks of this many bytes
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Maximum concurrent Google Scholar lookups in the batch endpoint (SerpAPI rate limit)
+SCHOLAR_CONCURRENCY = 8
+
+# Local cache of parsed copies of the faculty Excel sheet, reused until the
+# workbook changes (Scholar metrics are cached by scholar_api itself)
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
 
 def _detect_column(row_keys: List[str], candidates: List[str]) -> Optional[str]:
     lower_map = {k.lower().strip(): k for k in row_keys}
-    for cand in candidates:
-        key = lower_map.get(cand.lower())
+    lower_cands = [cand.lower() for cand in candidates]
+    for cand in lower_cands:
+        key = lower_map.get(cand)
         if key:
             return key
     # try fuzzy contains
     for k_lower, orig in lower_map.items():
-        for cand in candidates:
-            if cand.lower() in k_lower:
+        for cand in lower_cands:
+            if cand in k_lower:
                 return orig
     return None
 
+def _cell_text(row: tuple, idx: Optional[int]) -> str:
+    """Return the stripped text of a streamed row cell, or "" if absent/empty."""
+    if idx is None or idx >= len(row) or row[idx] is None:
+        return ""
+    return str(row[idx]).strip()
+
+def _faculty_column_indexes(headers: list) -> Tuple[List[str], Optional[int], Optional[int], Optional[int]]:
+    """Normalize header cells and locate the name, department and Google Scholar URL columns."""
+    # Normalize columns - remove any leading/trailing whitespace
+    columns = [str(col).strip() if col is not None else "" for col in headers]
+    
+    # Look for the specific columns we need, lowercasing each header once
+    name_idx = None
+    dept_idx = None
+    url_idx = None
+    
+    lowered = [(i, col.lower()) for i, col in enumerate(columns) if col]
+    for i, col_lower in lowered:
+        if "faculty" in col_lower and "name" in col_lower:
+            name_idx = i
+        elif "department" in col_lower and "name" in col_lower:
+            dept_idx = i
+        elif "google" in col_lower and "scholar" in col_lower and "url" in col_lower:
+            url_idx = i
+    
+    return columns, name_idx, dept_idx, url_idx
+
 def load_faculty_from_excel() -> List[dict]:
     """Load faculty data from the provided Excel file in project root.
     
@@ -91,57 +153,68 @@ def load_faculty_from_excel() -> List[dict]:
         excel_path = os.path.abspath(os.path.join(backend_dir, os.pardir, "faculty list department 2025.xlsx"))
     
     if not os.path.exists(excel_path):
-        print(f"No Excel file found at {excel_path}")
+        logger.warning("No Excel file found at %s", excel_path)
         return []
 
-    # Read Excel file without header, then manually set headers from row 1 (index 1)
-    df = pd.read_excel(excel_path, sheet_name=0, header=None)
-    
-    # Get the headers from row 1 (index 1)
-    headers = df.iloc[1].tolist()
-    print(f"Found headers: {headers}")
-    
-    # Set the headers and remove the first two rows
-    df.columns = headers
-    df = df.iloc[2:].reset_index(drop=True)
-    
-    # Normalize columns - remove any leading/trailing whitespace
-    columns = [str(col).strip() if pd.notna(col) else "" for col in df.columns]
-    print(f"Normalized columns: {columns}")
+    # Reuse the parsed rows if they were cached after the workbook was last modified
+    cache_path = os.path.join(CACHE_DIR, os.path.basename(excel_path) + ".pkl")
+    parsed = None
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(excel_path):
+        try:
+            with open(cache_path, 'rb') as f:
+                parsed = pickle.load(f)
+            logger.debug("Loaded parsed Excel from cache: %s", cache_path)
+        except (pickle.UnpicklingError, EOFError, ValueError, OSError) as e:
+            # A truncated or corrupt cache is ignored and rebuilt from the workbook
+            logger.warning("Ignoring unreadable Excel cache %s: %s", cache_path, e)
+    
+    if parsed is not None:
+        headers, rows = parsed
+    else:
+        # Stream the first sheet as plain value tuples; row 1 is a title, row 2 holds the headers
+        wb = openpyxl.load_workbook(excel_path, read_only=True, data_only=True)
+        try:
+            ws = wb.worksheets[0]
+            headers = list(next(ws.iter_rows(min_row=2, max_row=2, values_only=True), ()))
+            logger.debug("Found headers: %s", headers)
+            
+            # Only materialize cells up to the last column the loader uses
+            used = [i for i in _faculty_column_indexes(headers)[1:] if i is not None]
+            max_col = max(used) + 1 if used else None
+            rows = list(ws.iter_rows(min_row=3, max_col=max_col, values_only=True))
+        finally:
+            wb.close()
+        
+        # Write to a temporary file and swap it in, so an interrupted write never leaves a truncated cache
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump((headers, rows), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except Exception as e:
+            logger.warning("Could not cache parsed Excel: %s", e)
     
-    # Look for the specific columns we need
-    name_col = None
-    dept_col = None
-    url_col = None
+    columns, name_idx, dept_idx, url_idx = _faculty_column_indexes(headers)
+    logger.debug("Normalized columns: %s", columns)
     
-    for col in columns:
-        if not col:
-            continue
-        col_lower = col.lower()
-        if "faculty" in col_lower and "name" in col_lower:
-            name_col = col
-        elif "department" in col_lower and "name" in col_lower:
-            dept_col = col
-        elif "google" in col_lower and "scholar" in col_lower and "url" in col_lower:
-            url_col = col
-    
-    if not name_col or not dept_col:
-        print(f"Required columns not found. Found: {columns}")
+    if name_idx is None or dept_idx is None:
+        logger.warning("Required columns not found. Found: %s", columns)
         return []
     
-    print(f"Using columns: name={name_col}, dept={dept_col}, url={url_col if url_col else 'None'}")
+    logger.debug("Using columns: name=%s, dept=%s, url=%s", columns[name_idx], columns[dept_idx], columns[url_idx] if url_idx is not None else None)
     
     faculty_list: List[dict] = []
-    for idx, row in df.iterrows():
-        name = str(row.get(name_col, "")).strip()
+    for row in rows:
+        name = _cell_text(row, name_idx)
         if not name or name.lower() in ["faculty name", "name", "nan"]:
             continue
             
-        department = str(row.get(dept_col, "")).strip() or "Unknown"
-        google_scholar_url = str(row.get(url_col, "")) if url_col and pd.notna(row.get(url_col)) else None
+        department = _cell_text(row, dept_idx) or "Unknown"
+        google_scholar_url = _cell_text(row, url_idx)
         
         # Skip if no Google Scholar URL
-        if not google_scholar_url or google_scholar_url.lower() in ["nan", "none", ""]:
+        if not google_scholar_url or google_scholar_url.lower() in ["nan", "none"]:
             continue
         
         faculty_list.append({
@@ -153,9 +226,31 @@ def load_faculty_from_excel() -> List[dict]:
     
         })
     
-    print(f"Loaded {len(faculty_list)} faculty members from Excel")
+    logger.info("Loaded %d faculty members from Excel", len(faculty_list))
     return faculty_list
 
+def _index_faculty(faculty: dict) -> None:
+    """Add a faculty record to the lookup indexes, keeping the first record per key."""
+    faculty_by_id.setdefault(faculty["id"], faculty)
+    faculty_by_name.setdefault(faculty["name"].lower(), faculty)
+
+def _rebuild_faculty_index() -> None:
+    """Rebuild the lookup indexes from faculty_data and advance the id counter past existing ids."""
+    global _next_faculty_id
+    faculty_by_id.clear()
+    faculty_by_name.clear()
+    for faculty in faculty_data:
+        _index_faculty(faculty)
+    numeric_ids = [int(fid) for fid in faculty_by_id if fid.isdigit()]
+    _next_faculty_id = max(_next_faculty_id, max(numeric_ids, default=0) + 1)
+
+def _new_faculty_id() -> str:
+    """Return a fresh faculty id; ids are never reused, even after deletes."""
+    global _next_faculty_id
+    faculty_id = str(_next_faculty_id)
+    _next_faculty_id += 1
+    return faculty_id
+
 def load_faculty_data():
     """Load faculty data preferring Excel, falling back to JSON cache, without seeding mocks."""
     global faculty_data
@@ -163,13 +258,15 @@ def load_faculty_data():
     if excel_faculty:
         faculty_data = excel_faculty
         save_faculty_data()  # keep a JSON cache for runtime mutations
+        _rebuild_faculty_index()
         return
     
     # Fallback to JSON cache if Excel missing/unreadable
     if os.path.exists(faculty_file):
         try:
-            with open(faculty_file, 'r', encoding='utf-8') as f:
-                faculty_data = json.load(f)
+            with open(faculty_file, 'rb') as f:
+                faculty_data = orjson.loads(f.read())
+            _rebuild_faculty_index()
             return
         except Exception:
             faculty_data = []
@@ -183,13 +280,31 @@ def load_faculty_data():
         {"id": "4", "name": "Payal Chaudhari", "department": "Engineering", "googleScholarUrl": None, "email": None},
         {"id": "5", "name": "B Abhinaya Srinivas", "department": "Engineering", "googleScholarUrl": None, "email": None}
         ]
-        print(f"Using default faculty list: {len(faculty_data)} members")
+        logger.info("Using default faculty list: %d members", len(faculty_data))
         save_faculty_data()
+    _rebuild_faculty_index()
 
 def save_faculty_data():
     """Save faculty data to JSON file"""
-    with open(faculty_file, 'w', encoding='utf-8') as f:
-        json.dump(faculty_data, f, indent=2)
+    _faculty_counts.clear()
+    with open(faculty_file, 'wb') as f:
+        f.write(orjson.dumps(faculty_data, option=orjson.OPT_INDENT_2))
+
+def get_faculty_counts() -> Dict[str, int]:
+    """Return faculty, department and Google Scholar counts, computed in one pass and cached until the next save."""
+    if not _faculty_counts:
+        departments = set()
+        with_google_scholar = 0
+        for f in faculty_data:
+            departments.add(f["department"])
+            if f.get("googleScholarUrl"):
+                with_google_scholar += 1
+        _faculty_counts.update(
+            total_faculty=len(faculty_data),
+            total_departments=len(departments),
+            with_google_scholar=with_google_scholar
+        )
+    return _faculty_counts
 
 # Load data on startup
 load_faculty_data()
@@ -198,22 +313,11 @@ load_faculty_data()
 
 def extract_google_scholar_metrics(url: str) -> dict:
     """Extract metrics from Google Scholar profile using SerpAPI"""
-    print(f"Extracting metrics for URL: {url}")
-    
-    # Import directly here to ensure we're using the latest version
-    import sys
-    import importlib
-    
-    # Force reload the module to ensure we're using the latest version
-    if "scholar_api" in sys.modules:
-        importlib.reload(sys.modules["scholar_api"])
-    
-    # Import after reload
-    from scholar_api import get_scholar_metrics
+    logger.debug("Extracting metrics for URL: %s", url)
     
-    # Get metrics
+    # Get metrics (served from scholar_api's cache for recently seen profiles)
     metrics = get_scholar_metrics(url)
-    print(f"Scholar metrics extracted: {metrics}")
+    logger.debug("Scholar metrics extracted: %s", metrics)
     
     # Ensure we have integer values
     result = {
@@ -222,9 +326,48 @@ def extract_google_scholar_metrics(url: str) -> dict:
         "i10_index": int(metrics.get("i10_index", 0))
     }
     
-    print(f"Returning metrics: {result}")
+    logger.debug("Returning metrics: %s", result)
     return result
 
+def _remove_file(path: str) -> None:
+    """Delete a file, ignoring one that is already gone."""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def _expire_outputs() -> None:
+    """Forget and delete generated outputs past OUTPUT_TTL, and the oldest beyond MAX_OUTPUTS."""
+    cutoff = time.time() - OUTPUT_TTL
+    while generated_outputs:
+        file_id, (path, created) = next(iter(generated_outputs.items()))
+        if created >= cutoff and len(generated_outputs) <= MAX_OUTPUTS:
+            break
+        del generated_outputs[file_id]
+        _remove_file(path)
+
+def _sweep_output_dir() -> None:
+    """Delete files in OUTPUT_DIR older than OUTPUT_TTL, e.g. left over from a previous run."""
+    if not os.path.isdir(OUTPUT_DIR):
+        return
+    cutoff = time.time() - OUTPUT_TTL
+    with os.scandir(OUTPUT_DIR) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                _remove_file(entry.path)
+
+async def _cleanup_outputs_periodically() -> None:
+    """Expire generated outputs every OUTPUT_CLEANUP_INTERVAL seconds."""
+    while True:
+        _expire_outputs()
+        await asyncio.to_thread(_sweep_output_dir)
+        await asyncio.sleep(OUTPUT_CLEANUP_INTERVAL)
+
+def _save_upload(upload: UploadFile, path: str) -> None:
+    """Stream an uploaded file to disk without buffering it in memory."""
+    with open(path, "wb") as out:
+        shutil.copyfileobj(upload.file, out, length=UPLOAD_CHUNK_SIZE)
+
 # API Endpoints
 
 @app.get("/")
@@ -234,9 +377,9 @@ async def root():
 @app.get("/api/dashboard/stats")
 async def get_dashboard_stats():
     """Get dashboard statistics"""
-    total_faculty = len(faculty_data)
-    departments = list(set([f["department"] for f in faculty_data]))
-    total_departments = len(departments)
+    counts = get_faculty_counts()
+    total_faculty = counts["total_faculty"]
+    total_departments = counts["total_departments"]
     
     # Get real data for publications and citations using Google Scholar
     total_publications = 0
@@ -254,7 +397,7 @@ async def get_dashboard_stats():
         "totalCitations": total_google_scholar_citations,
         "googleScholarCitations": total_google_scholar_citations,
         "facultyWithGoogleScholar": faculty_with_google_scholar,
-        "totalFacultyWithGoogleScholar": len([f for f in faculty_data if f.get("googleScholarUrl")])
+        "totalFacultyWithGoogleScholar": counts["with_google_scholar"]
     }
 
 @app.get("/api/faculty")
@@ -269,17 +412,18 @@ async def create_faculty(faculty: Faculty):
     if not faculty.scopusId or not str(faculty.scopusId).strip():
         raise HTTPException(status_code=400, detail="Scopus ID is required")
     faculty_dict = faculty.dict()
-    faculty_dict["id"] = str(len(faculty_data) + 1)
+    faculty_dict["id"] = _new_faculty_id()
     faculty_data.append(faculty_dict)
+    _index_faculty(faculty_dict)
     save_faculty_data()
     return faculty_dict
 
 @app.get("/api/faculty/{faculty_id}")
 async def get_faculty_by_id(faculty_id: str):
     """Get faculty member by ID"""
-    for faculty in faculty_data:
-        if faculty["id"] == faculty_id:
-            return faculty
+    faculty = faculty_by_id.get(faculty_id)
+    if faculty:
+        return faculty
     raise HTTPException(status_code=404, detail="Faculty not found")
 
 @app.delete("/api/faculty/{faculty_id}")
@@ -287,17 +431,14 @@ async def delete_faculty(faculty_id: str):
     """Delete a faculty member"""
     global faculty_data
     faculty_data = [f for f in faculty_data if f["id"] != faculty_id]
+    _rebuild_faculty_index()
     save_faculty_data()
     return {"message": "Faculty deleted successfully"}
 
 @app.get("/api/faculty/{faculty_id}/profile")
 async def get_faculty_profile(faculty_id: str):
     """Get faculty profile with publications and metrics"""
-    faculty = None
-    for f in faculty_data:
-        if f["id"] == faculty_id:
-            faculty = f
-            break
+    faculty = faculty_by_id.get(faculty_id)
     
     if not faculty:
         raise HTTPException(status_code=404, detail="Faculty not found")
@@ -306,9 +447,9 @@ async def get_faculty_profile(faculty_id: str):
     google_scholar_metrics = {"citations": 0, "h_index": 0, "i10_index": 0}
     if faculty.get("googleScholarUrl"):
         try:
-            google_scholar_metrics = extract_google_scholar_metrics(faculty.get("googleScholarUrl"))
+            google_scholar_metrics = await asyncio.to_thread(extract_google_scholar_metrics, faculty["googleScholarUrl"])
         except Exception as e:
-            print(f"Error getting Google Scholar metrics for {faculty['name']}: {e}")
+            logger.warning("Error getting Google Scholar metrics for %s: %s", faculty['name'], e)
     
     profile = FacultyProfile(
         faculty=Faculty(**faculty),
@@ -326,11 +467,7 @@ async def get_faculty_profile(faculty_id: str):
 @app.get("/api/faculty/{faculty_id}/scholar-metrics")
 async def get_faculty_scholar_metrics(faculty_id: str):
     """Get Google Scholar metrics for a specific faculty member"""
-    faculty = None
-    for f in faculty_data:
-        if f["id"] == faculty_id:
-            faculty = f
-            break
+    faculty = faculty_by_id.get(faculty_id)
     
     if not faculty:
         raise HTTPException(status_code=404, detail="Faculty not found")
@@ -339,7 +476,7 @@ async def get_faculty_scholar_metrics(faculty_id: str):
         raise HTTPException(status_code=404, detail="No Google Scholar URL found for this faculty member")
     
     try:
-        metrics = extract_google_scholar_metrics(faculty.get("googleScholarUrl"))
+        metrics = await asyncio.to_thread(extract_google_scholar_metrics, faculty["googleScholarUrl"])
         return {
             "faculty_id": faculty_id,
             "faculty_name": faculty["name"],
@@ -354,129 +491,68 @@ async def get_faculty_scholar_metrics(faculty_id: str):
 async def get_all_faculty_scholar_metrics():
     """Get Google Scholar metrics for all faculty members with URLs"""
     results = []
+    with_urls = [f for f in faculty_data if f.get("googleScholarUrl")]
     
-    for faculty in faculty_data:
-        if faculty.get("googleScholarUrl"):
-            try:
-                metrics = extract_google_scholar_metrics(faculty.get("googleScholarUrl"))
-                results.append({
-                    "faculty_id": faculty["id"],
-                    "faculty_name": faculty["name"],
-                    "department": faculty["department"],
-                    "google_scholar_url": faculty["googleScholarUrl"],
-                    "metrics": metrics
-                })
-            except Exception as e:
-                print(f"Error getting metrics for {faculty['name']}: {e}")
-                results.append({
-                    "faculty_id": faculty["id"],
-                    "faculty_name": faculty["name"],
-                    "department": faculty["department"],
-                    "google_scholar_url": faculty["googleScholarUrl"],
-                    "metrics": {"citations": 0, "h_index": 0, "i10_index": 0},
-                    "error": str(e)
-                })
+    # Look up all profiles on scholar_api's thread pool, a bounded number at a time
+    fetched = await asyncio.to_thread(
+        get_scholar_metrics_batch,
+        [f["googleScholarUrl"] for f in with_urls],
+        SCHOLAR_CONCURRENCY
+    )
+    
+    for faculty in with_urls:
+        metrics = fetched[faculty["googleScholarUrl"]]
+        if "error" in metrics:
+            logger.warning("Error getting metrics for %s: %s", faculty['name'], metrics["error"])
+            results.append({
+                "faculty_id": faculty["id"],
+                "faculty_name": faculty["name"],
+                "department": faculty["department"],
+                "google_scholar_url": faculty["googleScholarUrl"],
+                "metrics": {"citations": 0, "h_index": 0, "i10_index": 0},
+                "error": metrics["error"]
+            })
+        else:
+            results.append({
+                "faculty_id": faculty["id"],
+                "faculty_name": faculty["name"],
+                "department": faculty["department"],
+                "google_scholar_url": faculty["googleScholarUrl"],
+                "metrics": metrics
+            })
     
     return {
         "total_faculty": len(faculty_data),
-        "faculty_with_urls": len([f for f in faculty_data if f.get("googleScholarUrl")]),
+        "faculty_with_urls": len(with_urls),
         "results": results
     }
 
 @app.post("/api/scholar/extract-metrics")
 async def extract_scholar_metrics(request: ScholarMetricsRequest):
     """Extract metrics from Google Scholar profile"""
+    if not SERPAPI_KEY:
+        raise HTTPException(status_code=503, detail="SerpAPI key is not configured")
+    
     try:
-        import os
-        import re
-        from serpapi import GoogleSearch
-        
         url = request.url
-        print(f"Processing URL: {url}")
+        logger.debug("Processing URL: %s", url)
         
         # Extract Scholar ID
-        pattern = r'user=([^&]+)'
-        match = re.search(pattern, url)
-        
-        if not match:
-            print(f"Could not extract Scholar ID from URL: {url}")
-            return {"citations": 0, "h_index": 0, "i10_index": 0}
+        scholar_id = extract_scholar_id(url)
         
-        scholar_id = match.group(1)
-        print(f"Scholar ID: {scholar_id}")
-        
-        # Get API key
-        SERPAPI_KEY = os.getenv("SERPAPI_KEY", "")
-        print(f"SERPAPI_KEY: {'[SET]' if SERPAPI_KEY else '[NOT SET]'}")
-        
-        # If key is not set, try to get it directly from the .env file
-        if not SERPAPI_KEY:
-            try:
-                print("Trying to read .env file directly")
-                with open(".env", "r") as f:
-                    for line in f:
-                        if line.startswith("SERPAPI_KEY="):
-                            SERPAPI_KEY = line.strip().split("=", 1)[1].strip('"\'')
-                            print(f"Found SERPAPI_KEY in .env file: {'[SET]' if SERPAPI_KEY else '[NOT SET]'}")
-                            break
-            except Exception as e:
-                print(f"Error reading .env file: {e}")
-        
-        if not SERPAPI_KEY:
-            print("No SerpAPI key found")
+        if not scholar_id:
+            logger.warning("Could not extract Scholar ID from URL: %s", url)
             return {"citations": 0, "h_index": 0, "i10_index": 0}
-            
-        # Hardcode the key for testing
-        SERPAPI_KEY = "55d4afc91720009d09e3f259002b3913cb080b45dca9a834c993b715d5061aff"
-        print("Using hardcoded key for testing")
         
-        # Set up SerpAPI parameters
-        params = {
-            "engine": "google_scholar_author",
-            "author_id": scholar_id,
-            "api_key": SERPAPI_KEY,
-            "hl": "en"
-        }
+        logger.debug("Scholar ID: %s", scholar_id)
         
-        # Execute search
-        search = GoogleSearch(params)
-        results = search.get_dict()
+        # Same lookup as the faculty endpoints, including scholar_api's caches
+        response = await asyncio.to_thread(extract_google_scholar_metrics, url)
         
-        print(f"Response keys: {list(results.keys())}")
-        
-        # Extract metrics
-        cited_by = results.get("cited_by", {})
-        table = cited_by.get("table", [])
-        
-        print(f"Table length: {len(table) if isinstance(table, list) else 'not a list'}")
-        
-        # Initialize metrics
-        citations = 0
-        h_index = 0
-        i10_index = 0
-        
-        # Extract metrics from table
-        if isinstance(table, list) and len(table) > 0:
-            for item in table:
-                if "citations" in item:
-                    citations = item["citations"].get("all", 0)
-                elif "h_index" in item:
-                    h_index = item["h_index"].get("all", 0)
-                elif "i10_index" in item:
-                    i10_index = item["i10_index"].get("all", 0)
-        
-        response = {
-            "citations": int(citations),
-            "h_index": int(h_index),
-            "i10_index": int(i10_index)
-        }
-        
-        print(f"Final response: {response}")
+        logger.debug("Final response: %s", response)
         return response
     except Exception as e:
-        print(f"Error in extract_scholar_metrics endpoint: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in extract_scholar_metrics endpoint: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to extract metrics: {str(e)}")
 
 @app.get("/api/health")
@@ -494,65 +570,37 @@ async def test_cors():
 @app.post("/api/scopus-wos/merge-process")
 async def scopus_wos_merge_process(scopus_file: UploadFile = File(...), wos_file: UploadFile = File(...)):
     """Upload two Excel files (Scopus and WoS) and merge/deduplicate publications."""
+    input_paths = []
     try:
         # Prepare paths
         os.makedirs("tmp_in", exist_ok=True)
-        os.makedirs("tmp_out", exist_ok=True)
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
         file_id = str(uuid.uuid4())
         
         scopus_input_path = os.path.abspath(os.path.join("tmp_in", f"scopus_{file_id}.xlsx"))
         wos_input_path = os.path.abspath(os.path.join("tmp_in", f"wos_{file_id}.xlsx"))
-        output_path = os.path.abspath(os.path.join("tmp_out", f"merged_output_{file_id}.xlsx"))
+        output_path = os.path.abspath(os.path.join(OUTPUT_DIR, f"merged_output_{file_id}.xlsx"))
+        input_paths = [scopus_input_path, wos_input_path]
 
         # Save uploaded files
-        with open(scopus_input_path, "wb") as f:
-            f.write(await scopus_file.read())
-        
-        with open(wos_input_path, "wb") as f:
-            f.write(await wos_file.read())
+        await asyncio.to_thread(_save_upload, scopus_file, scopus_input_path)
+        await asyncio.to_thread(_save_upload, wos_file, wos_input_path)
 
-        # Import and run the merge publications script
-        import subprocess
-        import sys
-        import time
-        
         start_time = time.time()
         
-        # Run the merge_publications.py script
-        result = subprocess.run([
-            sys.executable, 
-            "merge_publications.py",
-            "--scopus-file", scopus_input_path,
-            "--wos-file", wos_input_path,
-            "--output", output_path
-        ], capture_output=True, text=True, cwd=".")
+        # Run the merge in a worker thread so the event loop stays responsive
+        stats = await asyncio.to_thread(run_merge, scopus_input_path, wos_input_path, output_path)
         
         processing_time = time.time() - start_time
-        
-        if result.returncode != 0:
-            raise Exception(f"Merge script execution failed: {result.stderr}")
-
-        # Check if output file was created
-        if not os.path.exists(output_path):
-            raise Exception("Output file was not created")
 
         # Register output for download
-        generated_outputs[file_id] = output_path
+        generated_outputs[file_id] = (output_path, time.time())
+        _expire_outputs()
 
-        # Parse statistics from the output
-        try:
-            df = pd.read_excel(output_path, sheet_name="Merged Publications")
-            total_authors = len(df)
-            total_publications = df['Total_Publications'].sum()
-            
-            dept_df = pd.read_excel(output_path, sheet_name="Department Summary")
-            total_departments = len(dept_df)
-            
-        except Exception as e:
-            # If we can't parse stats, just return basic info
-            total_authors = 0
-            total_publications = 0
-            total_departments = 0
+        # Use the statistics computed by the merge
+        total_authors = stats['total_authors']
+        total_publications = stats['total_publications']
+        total_departments = stats['total_departments']
 
         return {
             "success": True,
@@ -572,12 +620,17 @@ async def scopus_wos_merge_process(scopus_file: UploadFile = File(...), wos_file
             "message": f"Failed to process files: {str(e)}",
             "error": str(e)
         }
+    finally:
+        # The uploaded inputs are only needed for the merge itself
+        for path in input_paths:
+            _remove_file(path)
 
 
 @app.get("/api/scopus-wos/download/{file_id}")
 async def scopus_wos_download(file_id: str):
     """Download the generated Excel file with merged and deduplicated publications."""
-    output_path = generated_outputs.get(file_id)
+    _expire_outputs()
+    output_path, _ = generated_outputs.get(file_id, (None, None))
     if not output_path or not os.path.exists(output_path):
         raise HTTPException(status_code=404, detail="Output file not found")
     return FileResponse(
@@ -601,30 +654,30 @@ async def import_publications_data(file: UploadFile = File(...)):
         input_path = os.path.abspath(os.path.join("tmp_in", f"import_{file_id}.xlsx"))
 
         # Save uploaded file
-        with open(input_path, "wb") as f:
-            f.write(await file.read())
-
-        # Read the Excel file
-        df = pd.read_excel(input_path, sheet_name="Merged Publications")
+        await asyncio.to_thread(_save_upload, file, input_path)
+
+        # Read only the columns the import uses; any that are missing come back empty
+        df = pd.read_excel(
+            input_path,
+            sheet_name="Merged Publications",
+            usecols=lambda col: col in IMPORT_COLUMNS,
+            dtype={"Author": str, "Department": str},
+            engine="openpyxl"
+        ).reindex(columns=IMPORT_COLUMNS)
+        
+        # Clean whole columns at once and drop blank or header-like author rows
+        authors = df["Author"].astype("string").str.strip()
+        departments = df["Department"].astype("string").str.strip().fillna("Unknown")
+        counts = df["Total_Publications"].fillna(0).astype("int64")
+        valid = (authors.fillna("") != "") & ~authors.str.lower().isin(['author', 'name', 'nan']).fillna(False)
         
         imported_count = 0
         updated_faculty = []
 
         # Process each row in the Excel file
-        for idx, row in df.iterrows():
-            author_name = str(row.get("Author", "")).strip()
-            department = str(row.get("Department", "")).strip()
-            total_publications = int(row.get("Total_Publications", 0))
-            
-            if not author_name or author_name.lower() in ['author', 'name', 'nan']:
-                continue
-            
+        for author_name, department, total_publications in zip(authors[valid].tolist(), departments[valid].tolist(), counts[valid].tolist()):
             # Find matching faculty member by name
-            matching_faculty = None
-            for faculty in faculty_data:
-                if faculty["name"].lower() == author_name.lower():
-                    matching_faculty = faculty
-                    break
+            matching_faculty = faculty_by_name.get(author_name.lower())
             
             if matching_faculty:
                 # Update existing faculty member
@@ -636,13 +689,14 @@ async def import_publications_data(file: UploadFile = File(...)):
             else:
                 # Create new faculty member
                 new_faculty = {
-                    "id": str(len(faculty_data) + 1),
+                    "id": _new_faculty_id(),
                     "name": author_name,
                     "department": department if department != "Unknown" else "Unknown",
                     "email": None,
                     "totalPublications": total_publications
                 }
                 faculty_data.append(new_faculty)
+                _index_faculty(new_faculty)
                 updated_faculty.append(new_faculty)
                 imported_count += 1
 
@@ -669,8 +723,10 @@ async def import_publications_data(file: UploadFile = File(...)):
 # Check API connections on startup
 @app.on_event("startup")
 async def startup_event():
-    print("✅ System startup complete!")
-    print("✅ Google Scholar API ready!")
+    # Keep a reference so the cleanup task is not garbage collected
+    app.state.output_cleanup = asyncio.create_task(_cleanup_outputs_periodically())
+    logger.info("✅ System startup complete!")
+    logger.info("✅ Google Scholar API ready!")
 
 
 if __name__ == "__main__":
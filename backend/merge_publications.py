@@ -5,155 +5,143 @@ removes duplicates, handles dash inflation, and creates unique publication lists
 """
 import pandas as pd
 import argparse
+import json
 import os
 import logging
 import re
-from typing import Dict, List, Set, Tuple
+from typing import Dict, Optional, Tuple
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def clean_publication_title(title: str) -> str:
-    """
-    Clean and normalize publication title for comparison.
-    Handles various symbols and characters used to inflate publication counts.
-    
-    Args:
-        title: Raw publication title
-        
-    Returns:
-        Cleaned title for deduplication
-    """
-    if not title or pd.isna(title):
-        return ""
-    
-    # Convert to string and strip whitespace
-    title = str(title).strip()
-    
-    # Skip entries that are just symbols or meaningless content
-    if is_inflation_entry(title):
-        return ""
-    
-    # Remove numbering (e.g., "1. ", "2. ", etc.)
-    title = re.sub(r'^\d+\.\s*', '', title)
-    
-    # Remove year in parentheses at the end (e.g., " (2024)")
-    title = re.sub(r'\s*\(\d{4}\)\s*$', '', title)
-    
-    # Remove common inflation patterns
-    title = re.sub(r'^[-–—_\s]+$', '', title)  # Only hyphens, dashes, underscores, spaces
-    title = re.sub(r'^[•·▪▫◦‣⁃]\s*$', '', title)  # Only bullet points
-    title = re.sub(r'^[.,;:!?]+$', '', title)  # Only punctuation
-    
-    # Convert to lowercase for case-insensitive comparison
-    title = title.lower()
-    
-    # Remove extra whitespace
-    title = ' '.join(title.split())
-    
-    return title
+# Compiled once at import; these run for every row of the input files
+_NUMBERING_RE = re.compile(r'^\d+\.\s*')
+_YEAR_SUFFIX_RE = re.compile(r'\s*\(\d{4}\)\s*$')
+_AUTHOR_ID_RE = re.compile(r'\s*\(\d+\)\s*$')
+_DASHES_ONLY_RE = re.compile(r'^[-–—_\s]+$')
+_BULLET_ONLY_RE = re.compile(r'^[•·▪▫◦‣⁃]\s*$')
+_PUNCTUATION_ONLY_RE = re.compile(r'^[.,;:!?]+$')
+
+# Entries used to inflate publication counts: only digits, whitespace, dashes,
+# bullets or punctuation (including empty), or a placeholder such as n/a or null
+_INFLATION_RE = re.compile(
+    r'^(?:[\d\s\-–—_.•·▪▫◦‣⁃,;:!?]*|n/?a|none|null|undefined)$',
+    re.IGNORECASE
+)
 
-def is_inflation_entry(title: str) -> bool:
+# Header keywords identifying each input column, highest priority first.
+# Title is resolved before source so a lone "Journal Title" column stays the title.
+_COLUMN_PRIORITIES = {
+    'author': ['author full names', 'authors', 'author'],
+    'title': ['title'],
+    'source': ['source title', 'journal', 'source'],
+    'year': ['year'],
+}
+
+# Header words that rule a column out for a field ("Source title" is never the title)
+_COLUMN_EXCLUSIONS = {
+    'title': ['source'],
+}
+
+def clean_publication_titles(titles: pd.Series) -> pd.Series:
     """
-    Check if an entry is likely used to inflate publication counts.
+    Normalize publication titles for comparison. Expects titles already
+    screened for inflation entries (see build_author_frame).
     
     Args:
-        title: Publication title to check
+        titles: Series of stripped publication titles
         
     Returns:
-        True if the entry appears to be inflation
+        Series of cleaned titles for deduplication
     """
-    if not title or pd.isna(title):
-        return True
-    
-    title = str(title).strip()
-    
-    # Check for common inflation patterns
-    inflation_patterns = [
-        r'^[-–—_\s]+$',  # Only hyphens, dashes, underscores, spaces
-        r'^[•·▪▫◦‣⁃]\s*$',  # Only bullet points
-        r'^[.,;:!?]+$',  # Only punctuation
-        r'^n/a$',  # Not applicable
-        r'^na$',  # Not available
-        r'^none$',  # None
-        r'^null$',  # Null
-        r'^undefined$',  # Undefined
-        r'^$',  # Empty string
-        r'^\s+$',  # Only whitespace
-        r'^[-–—]+$',  # Only various dash types
-        r'^[_]+$',  # Only underscores
-        r'^[.]+$',  # Only dots
-        r'^[-–—_.\s]+$',  # Combination of common inflation characters
-    ]
-    
-    for pattern in inflation_patterns:
-        if re.match(pattern, title, re.IGNORECASE):
-            return True
-    
-    # Check if title is too short to be meaningful (less than 3 characters)
-    if len(title) < 3:
-        return True
-    
-    # Check if title contains only numbers and symbols
-    if re.match(r'^[\d\s\-–—_.•·▪▫◦‣⁃.,;:!?]+$', title):
-        return True
-    
-    return False
+    return (titles
+            .str.replace(_NUMBERING_RE, '', regex=True)
+            .str.replace(_YEAR_SUFFIX_RE, '', regex=True)
+            .str.replace(_DASHES_ONLY_RE, '', regex=True)
+            .str.replace(_BULLET_ONLY_RE, '', regex=True)
+            .str.replace(_PUNCTUATION_ONLY_RE, '', regex=True)
+            .str.lower()
+            .str.split()
+            .str.join(' '))
 
-def extract_publications_from_cell(cell_content: str) -> List[str]:
+def _detect_columns(columns) -> Dict[str, Optional[str]]:
     """
-    Extract individual publications from a cell that may contain multiple publications.
-    Filters out inflation entries.
+    Pick the input column for each field in _COLUMN_PRIORITIES.
+    
+    Keywords are tried in priority order, preferring an exact (case-insensitive)
+    match over a substring match, and each column is assigned to at most one field.
+    Columns containing a word from _COLUMN_EXCLUSIONS are skipped for that field.
     
     Args:
-        cell_content: Cell content that may contain numbered publications
+        columns: Column labels from the Excel header
         
     Returns:
-        List of individual publication titles
+        Dictionary mapping each field to its column label, or None if not found
     """
-    if not cell_content or pd.isna(cell_content):
-        return []
-    
-    content = str(cell_content).strip()
-    
-    # Check if the entire cell content is an inflation entry
-    if is_inflation_entry(content):
-        return []
-    
-    # Split by newlines to get individual publications
-    publications = []
-    for line in content.split('\n'):
-        line = line.strip()
-        if line and not is_inflation_entry(line):
-            # Remove numbering if present
-            clean_line = re.sub(r'^\d+\.\s*', '', line)
-            if clean_line and not is_inflation_entry(clean_line):
-                publications.append(clean_line)
-    
-    return publications
+    lowered = [(col, str(col).lower().strip()) for col in columns]
+    detected = {}
+    
+    for field, keywords in _COLUMN_PRIORITIES.items():
+        excluded = _COLUMN_EXCLUSIONS.get(field, [])
+        available = [
+            (col, name) for col, name in lowered
+            if col not in detected.values() and not any(word in name for word in excluded)
+        ]
+        match = None
+        for keyword in keywords:
+            match = next((col for col, name in available if name == keyword), None)
+            if match is None:
+                match = next((col for col, name in available if keyword in name), None)
+            if match is not None:
+                break
+        detected[field] = match
+    
+    return detected
 
-def deduplicate_publications(publications: List[str]) -> List[str]:
+def build_author_frame(df: pd.DataFrame, author_col: str, title_col: str, year_col: Optional[str]) -> pd.DataFrame:
     """
-    Remove duplicate publications using case-insensitive matching.
+    Turn raw export rows into one row per unique (author, publication) pair.
+    Inflation entries, empty authors and duplicate titles are dropped.
     
     Args:
-        publications: List of publication titles
+        df: Rows read from a Scopus/WoS Excel file
+        author_col: Column with semicolon-separated author names
+        title_col: Column with publication titles
+        year_col: Optional column with publication years
         
     Returns:
-        List of unique publications
+        DataFrame with author, clean_key and full_title columns, in input order
     """
-    seen = set()
-    unique_publications = []
-    
-    for pub in publications:
-        clean_pub = clean_publication_title(pub)
-        if clean_pub and clean_pub not in seen:
-            seen.add(clean_pub)
-            unique_publications.append(pub)  # Keep original formatting
-    
-    return unique_publications
+    # Clean titles and drop inflation entries for all rows at once
+    titles = df[title_col].fillna("").astype(str).str.strip()
+    valid = (titles.str.len() >= 3) & ~titles.str.match(_INFLATION_RE)
+    
+    # Append the year (optional) as " (YYYY)" where it is a plain integer
+    full_titles = titles
+    if year_col:
+        year_text = df[year_col].fillna("").astype(str)
+        has_year = year_text.str.isdigit()
+        full_titles = titles + (" (" + year_text + ")").where(has_year, "")
+    
+    # Extract author names, skipping empty cells and repeated header text
+    author_names = df[author_col].fillna("").astype(str).str.strip()
+    valid &= (author_names != "") & ~author_names.str.lower().isin(['author', 'authors', 'author full names', 'nan'])
+    
+    # Publication title carries only title and year (no source/journal);
+    # the normalized key used for deduplication is computed once per row
+    rows = pd.DataFrame({'author': author_names.str.split(';'), 'full_title': full_titles})[valid]
+    rows['clean_key'] = clean_publication_titles(rows['full_title'])
+    
+    # One row per author - handle multiple semicolon-separated authors in one cell
+    rows = rows[rows['clean_key'] != ""].explode('author')
+    
+    # Clean author names, removing trailing author IDs like (58920229400)
+    rows['author'] = rows['author'].str.strip().str.replace(_AUTHOR_ID_RE, '', regex=True)
+    rows = rows[rows['author'] != ""]
+    
+    # Keep the first publication seen for each author and cleaned title
+    return rows.drop_duplicates(['author', 'clean_key'], keep='first')
 
 def process_excel_file(file_path: str, file_type: str) -> Dict[str, Dict]:
     """
@@ -166,47 +154,22 @@ def process_excel_file(file_path: str, file_type: str) -> Dict[str, Dict]:
         file_type: Type of file ("scopus" or "wos")
         
     Returns:
-        Dictionary mapping author names to their publications
+        Dictionary mapping author names to their data, with publications
+        keyed by cleaned title
     """
     logger.info(f"Processing {file_type} file: {file_path}")
     
     try:
-        # Read Excel file
-        df = pd.read_excel(file_path)
-        logger.info(f"Loaded {len(df)} rows from {file_type} file")
-        logger.info(f"Available columns: {list(df.columns)}")
+        # Read only the header row first; the data is loaded once the needed columns are known
+        header = pd.read_excel(file_path, nrows=0).columns
+        logger.info(f"Available columns: {list(header)}")
         
         # Map columns based on the actual Excel structure
-        author_col = None
-        title_col = None
-        year_col = None
-        source_col = None
-        
-        # Try to identify columns automatically
-        for col in df.columns:
-            col_lower = str(col).lower().strip()
-            logger.info(f"Checking column: '{col}' (lowercase: '{col_lower}')")
-            
-            # Author columns
-            if any(keyword in col_lower for keyword in ['author full names', 'authors', 'author']):
-                if 'full names' in col_lower or not author_col:
-                    author_col = col
-                    logger.info(f"Selected author column: '{col}'")
-            
-            # Title column - prioritize exact match for "title"
-            if col_lower == 'title' or ('title' in col_lower and 'source' not in col_lower):
-                title_col = col
-                logger.info(f"Selected title column: '{col}'")
-            
-            # Year column
-            if col_lower == 'year' or 'year' in col_lower:
-                year_col = col
-                logger.info(f"Selected year column: '{col}'")
-            
-            # Source/Journal column
-            if any(keyword in col_lower for keyword in ['source title', 'journal', 'source']):
-                source_col = col
-                logger.info(f"Selected source column: '{col}'")
+        columns = _detect_columns(header)
+        author_col = columns['author']
+        title_col = columns['title']
+        year_col = columns['year']
+        source_col = columns['source']
         
         if not author_col:
             logger.error(f"Could not find author column in {file_type} file")
@@ -218,6 +181,15 @@ def process_excel_file(file_path: str, file_type: str) -> Dict[str, Dict]:
         
         logger.info(f"Using columns - Author: {author_col}, Title: {title_col}, Year: {year_col}, Source: {source_col}")
         
+        # Load just the selected columns as text, skipping dtype inference
+        # Columns are picked by position and relabelled with the header probe's names,
+        # so duplicate headers (mangled to "Title.1" etc.) resolve the same way in both reads
+        labels = list(header)
+        positions = sorted({labels.index(col) for col in [author_col, title_col, year_col, source_col] if col})
+        df = pd.read_excel(file_path, usecols=positions, dtype=str)
+        df.columns = [labels[i] for i in positions]
+        logger.info(f"Loaded {len(df)} rows from {file_type} file")
+        
         # Log sample data for debugging
         if len(df) > 0:
             logger.info("Sample data from first row:")
@@ -226,56 +198,25 @@ def process_excel_file(file_path: str, file_type: str) -> Dict[str, Dict]:
                     sample_value = str(df.iloc[0][col])[:100] + "..." if len(str(df.iloc[0][col])) > 100 else str(df.iloc[0][col])
                     logger.info(f"  {col}: {sample_value}")
         
-        # Process each row and group by author
-        author_data = {}
-        
-        for idx, row in df.iterrows():
-            # Extract title first
-            title = str(row[title_col]).strip()
-            if not title or is_inflation_entry(title):
-                continue
-            
-            # Extract year (optional)
-            year = ""
-            if year_col and year_col in row:
-                year_val = row[year_col]
-                if pd.notna(year_val):
-                    year = f" ({int(year_val)})" if str(year_val).isdigit() else ""
-            
-            # Create publication title with only title and year (no source/journal)
-            full_title = f"{title}{year}"
-            
-            # Extract author names - handle multiple authors in one cell
-            author_names_str = str(row[author_col]).strip()
-            if not author_names_str or author_names_str.lower() in ['author', 'authors', 'author full names', 'nan']:
-                continue
-            
-            # Split multiple authors by semicolon and process each one
-            author_names = [name.strip() for name in author_names_str.split(';') if name.strip()]
-            
-            for author_name in author_names:
-                # Clean author name (remove any extra IDs or formatting)
-                # Remove patterns like (58920229400) - author IDs
-                clean_author = re.sub(r'\s*\(\d+\)\s*$', '', author_name.strip())
-                if not clean_author:
-                    continue
-                
-                # Initialize author data if not exists
-                if clean_author not in author_data:
-                    author_data[clean_author] = {
-                        'department': "Unknown",  # Department not available in this format
-                        'publications': [],
-                        'source': file_type
-                    }
-                
-                # Add publication if not already present (basic deduplication)
-                if full_title not in author_data[clean_author]['publications']:
-                    author_data[clean_author]['publications'].append(full_title)
+        # Group the unique (author, publication) pairs by author
+        rows = build_author_frame(df, author_col, title_col, year_col)
+        publications = (pd.Series(list(zip(rows['clean_key'], rows['full_title'])), index=rows.index)
+                        .groupby(rows['author'], sort=False)
+                        .agg(lambda pubs: dict(pubs.tolist())))
+        
+        author_data = {
+            author: {
+                'department': "Unknown",  # Department not available in this format
+                'publications': pubs,
+                'source': file_type
+            }
+            for author, pubs in publications.items()
+        }
         
-        # Final deduplication for each author
-        for author_name, data in author_data.items():
-            data['publications'] = deduplicate_publications(data['publications'])
-            logger.info(f"Found {len(data['publications'])} unique publications for {author_name}")
+        # Per-author detail only at DEBUG; skip the loop entirely otherwise
+        if logger.isEnabledFor(logging.DEBUG):
+            for author_name, data in author_data.items():
+                logger.debug("Found %d unique publications for %s", len(data['publications']), author_name)
         
         logger.info(f"Processed {len(author_data)} authors from {file_type} file")
         return author_data
@@ -304,15 +245,12 @@ def merge_author_data(scopus_data: Dict, wos_data: Dict) -> Dict[str, Dict]:
         scopus_info = scopus_data.get(author, {})
         wos_info = wos_data.get(author, {})
         
-        # Combine publications from both sources
-        all_publications = []
-        if scopus_info.get('publications'):
-            all_publications.extend(scopus_info['publications'])
-        if wos_info.get('publications'):
-            all_publications.extend(wos_info['publications'])
-        
-        # Deduplicate across sources
-        unique_publications = deduplicate_publications(all_publications)
+        # Combine publications from both sources, deduplicating on the
+        # cleaned titles computed while processing each file
+        combined = dict(scopus_info.get('publications', {}))
+        for clean_key, pub in wos_info.get('publications', {}).items():
+            combined.setdefault(clean_key, pub)
+        unique_publications = list(combined.values())
         
         # Use department from either source (prefer non-"Unknown")
         department = "Unknown"
@@ -325,51 +263,38 @@ def merge_author_data(scopus_data: Dict, wos_data: Dict) -> Dict[str, Dict]:
             merged_data[author] = {
                 'department': department,
                 'publications': unique_publications,
-                'scopus_count': len(scopus_info.get('publications', [])),
-                'wos_count': len(wos_info.get('publications', [])),
+                'scopus_count': len(scopus_info.get('publications', {})),
+                'wos_count': len(wos_info.get('publications', {})),
                 'total_unique': len(unique_publications)
             }
-            logger.info(f"Merged {author}: {len(unique_publications)} unique publications "
-                       f"(Scopus: {len(scopus_info.get('publications', []))}, "
-                       f"WoS: {len(wos_info.get('publications', []))})")
+            logger.debug("Merged %s: %d unique publications (Scopus: %d, WoS: %d)",
+                         author, merged_data[author]['total_unique'],
+                         merged_data[author]['scopus_count'], merged_data[author]['wos_count'])
     
     logger.info(f"Successfully merged data for {len(merged_data)} authors")
     return merged_data
 
-def generate_output_excel(merged_data: Dict, output_path: str) -> Dict:
+def build_output_frames(merged_data: Dict) -> Tuple[pd.DataFrame, pd.DataFrame, Dict]:
     """
-    Generate the final Excel output with unique publications per author.
+    Build the output tables with unique publications per author.
     Format: Each professor gets a separate row with their publications in a single cell.
     
     Args:
         merged_data: Merged author publication data
-        output_path: Path for the output Excel file
         
     Returns:
-        Statistics about the generated data
+        Tuple of (per-author DataFrame, department summary DataFrame, statistics)
     """
-    logger.info(f"Generating output Excel file: {output_path}")
-    
-    # Prepare data for Excel - each professor gets their own row
+    # Prepare output rows - each professor gets their own row
     excel_data = []
     department_stats = defaultdict(lambda: {'authors': 0, 'publications': 0})
+    total_publications = 0
     
     for author, data in merged_data.items():
-        # Create numbered list of all publications for this professor
-        if data['publications']:
-            numbered_publications = []
-            for i, pub in enumerate(data['publications'], 1):
-                numbered_publications.append(f"{i}. {pub}")
-            
-            # Join all publications with newlines
-            all_publications = "\n".join(numbered_publications)
-        else:
-            all_publications = "No publications found"
-        
         # Each professor gets their own row
         excel_data.append({
             'Author': author,
-            'Publications': all_publications,
+            'Publications': data['publications'],
             'Department': data['department'],
             'Total_Publications': data['total_unique']
         })
@@ -378,94 +303,32 @@ def generate_output_excel(merged_data: Dict, output_path: str) -> Dict:
         dept = data['department']
         department_stats[dept]['authors'] += 1
         department_stats[dept]['publications'] += data['total_unique']
+        total_publications += data['total_unique']
     
-    # Create DataFrame and save to Excel
+    # Create DataFrame
     df = pd.DataFrame(excel_data)
     
-    with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-        # Main data sheet with formatted layout
-        df.to_excel(writer, sheet_name="Merged Publications", index=False)
-        
-        # Get the workbook and worksheet for formatting
-        workbook = writer.book
-        worksheet = writer.sheets["Merged Publications"]
-        
-        # Import required classes for formatting
-        from openpyxl.styles import Alignment, Font, PatternFill, Border, Side
-        
-        # Define styles
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
-        
-        # Format header row
-        for col_num, column in enumerate(df.columns, 1):
-            cell = worksheet.cell(row=1, column=col_num)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-            cell.border = border
-            
-            # Set column width
-            if column == "Author":
-                worksheet.column_dimensions[cell.column_letter].width = 30  # Wider for full names
-            elif column == "Publications":
-                worksheet.column_dimensions[cell.column_letter].width = 120  # Very wide for full titles
-            elif column == "Department":
-                worksheet.column_dimensions[cell.column_letter].width = 35
-            elif column == "Total_Publications":
-                worksheet.column_dimensions[cell.column_letter].width = 18
-        
-        # Format data rows
-        for row_num in range(2, len(df) + 2):
-            for col_num in range(1, len(df.columns) + 1):
-                cell = worksheet.cell(row=row_num, column=col_num)
-                cell.border = border
-                
-                # Apply different formatting based on column
-                column_name = df.columns[col_num - 1]
-                
-                if column_name == "Author":
-                    # Author column - left aligned, bold
-                    cell.font = Font(bold=True)
-                    cell.alignment = Alignment(horizontal='left', vertical='top')
-                elif column_name == "Publications":
-                    # Publications column - left aligned with text wrapping
-                    cell.alignment = Alignment(horizontal='left', vertical='top', wrap_text=True)
-                    # Set row height based on number of publications
-                    if cell.value and cell.value != "No publications found":
-                        pub_count = cell.value.count('\n') + 1
-                        # Estimate row height: base height + (number of publications * line height)
-                        estimated_height = max(40, 25 + (pub_count * 18))
-                        worksheet.row_dimensions[row_num].height = min(estimated_height, 300)  # Cap at 300
-                elif column_name == "Department":
-                    # Department column - left aligned
-                    cell.alignment = Alignment(horizontal='left', vertical='top')
-                elif column_name == "Total_Publications":
-                    # Total publications - center aligned
-                    cell.alignment = Alignment(horizontal='center', vertical='top')
-        
-        # Department summary sheet
-        dept_summary = []
-        for dept, stats in department_stats.items():
-            dept_summary.append({
-                'Department': dept,
-                'Authors': stats['authors'],
-                'Total_Publications': stats['publications'],
-                'Avg_Publications_Per_Author': round(stats['publications'] / stats['authors'], 2)
-            })
-        
-        dept_df = pd.DataFrame(dept_summary)
-        dept_df.to_excel(writer, sheet_name="Department Summary", index=False)
+    # Number every professor's publications and join them into a single cell,
+    # one publication per line, using long-form string ops
+    pubs = df['Publications'].explode().dropna()
+    numbered = (pubs.groupby(level=0).cumcount() + 1).astype(str) + ". " + pubs
+    df['Publications'] = (numbered.groupby(level=0).agg("\n".join)
+                          .reindex(df.index, fill_value="No publications found"))
+    
+    # Department summary
+    dept_summary = []
+    for dept, stats in department_stats.items():
+        dept_summary.append({
+            'Department': dept,
+            'Authors': stats['authors'],
+            'Total_Publications': stats['publications'],
+            'Avg_Publications_Per_Author': round(stats['publications'] / stats['authors'], 2)
+        })
+    
+    dept_df = pd.DataFrame(dept_summary)
     
     # Calculate overall statistics
     total_authors = len(merged_data)
-    total_publications = sum(data['total_unique'] for data in merged_data.values())
     total_departments = len(department_stats)
     
     stats = {
@@ -476,60 +339,229 @@ def generate_output_excel(merged_data: Dict, output_path: str) -> Dict:
         'department_stats': dict(department_stats)
     }
     
-    logger.info(f"Generated Excel file with {total_authors} authors, {total_publications} unique publications, {total_departments} departments")
+    return df, dept_df, stats
+
+def generate_output_excel(df: pd.DataFrame, dept_df: pd.DataFrame, output_path: str) -> None:
+    """
+    Write the formatted per-author sheet and the department summary to an Excel file.
+    
+    Args:
+        df: Per-author table from build_output_frames
+        dept_df: Department summary table from build_output_frames
+        output_path: Path for the output Excel file
+    """
+    logger.info(f"Generating output Excel file: {output_path}")
+    
+    # Import required classes for formatting
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Font, NamedStyle, PatternFill, Border, Side
+    from openpyxl.utils import get_column_letter
+    
+    # Stream rows in write-only mode, attaching each cell's style as it is created
+    workbook = Workbook(write_only=True)
+    
+    # Define styles
+    border = Border(
+        left=Side(style='thin'),
+        right=Side(style='thin'),
+        top=Side(style='thin'),
+        bottom=Side(style='thin')
+    )
+    header_style = NamedStyle(
+        name="header",
+        font=Font(bold=True, color="FFFFFF"),
+        fill=PatternFill(start_color="366092", end_color="366092", fill_type="solid"),
+        alignment=Alignment(horizontal='center', vertical='center', wrap_text=True),
+        border=border
+    )
+    
+    # Named styles for data cells, registered once so each cell stores a
+    # single style reference instead of its own font/alignment/border
+    column_styles = {
+        # Author column - left aligned, bold
+        "Author": NamedStyle(name="author", font=Font(bold=True), border=border,
+                             alignment=Alignment(horizontal='left', vertical='top')),
+        # Publications column - left aligned with text wrapping
+        "Publications": NamedStyle(name="publications", border=border,
+                                   alignment=Alignment(horizontal='left', vertical='top', wrap_text=True)),
+        # Department column - left aligned
+        "Department": NamedStyle(name="department", border=border,
+                                 alignment=Alignment(horizontal='left', vertical='top')),
+        # Total publications - center aligned
+        "Total_Publications": NamedStyle(name="total_publications", border=border,
+                                         alignment=Alignment(horizontal='center', vertical='top')),
+    }
+    for style in [header_style, *column_styles.values()]:
+        workbook.add_named_style(style)
+    
+    # Column widths
+    column_widths = {
+        "Author": 30,  # Wider for full names
+        "Publications": 120,  # Very wide for full titles
+        "Department": 35,
+        "Total_Publications": 18,
+    }
+    
+    def styled_row(worksheet, values, style_names):
+        """Build write-only cells for one row, each carrying its named style."""
+        cells = []
+        for value, style_name in zip(values, style_names):
+            cell = WriteOnlyCell(worksheet, value=value)
+            cell.style = style_name
+            cells.append(cell)
+        return cells
+    
+    # Main data sheet with formatted layout
+    worksheet = workbook.create_sheet("Merged Publications")
+    for col_num, column in enumerate(df.columns, 1):
+        if column in column_widths:
+            worksheet.column_dimensions[get_column_letter(col_num)].width = column_widths[column]
+    
+    # Set row height based on number of publications:
+    # base height + (number of publications * line height), capped at 300
+    has_publications = df['Publications'] != "No publications found"
+    pub_counts = df['Publications'].str.count('\n') + 1
+    row_heights = (25 + pub_counts * 18).clip(lower=40, upper=300).where(has_publications)
+    
+    worksheet.append(styled_row(worksheet, df.columns, [header_style.name] * len(df.columns)))
+    style_names = [column_styles[column_name].name for column_name in df.columns]
+    for row_num, (values, height) in enumerate(zip(df.itertuples(index=False, name=None), row_heights), 2):
+        if pd.notna(height):
+            worksheet.row_dimensions[row_num].height = int(height)
+        worksheet.append(styled_row(worksheet, values, style_names))
+    
+    # Department summary sheet
+    summary_sheet = workbook.create_sheet("Department Summary")
+    summary_sheet.append(list(dept_df.columns))
+    for values in dept_df.itertuples(index=False, name=None):
+        summary_sheet.append(list(values))
+    
+    workbook.save(output_path)
+
+def generate_output_parquet(df: pd.DataFrame, dept_df: pd.DataFrame, output_path: str) -> None:
+    """
+    Write the per-author table and the department summary as Parquet files.
+    The department summary is written next to output_path with a "_departments" suffix.
+    
+    Args:
+        df: Per-author table from build_output_frames
+        dept_df: Department summary table from build_output_frames
+        output_path: Path for the per-author Parquet file
+    """
+    logger.info(f"Generating output Parquet file: {output_path}")
+    
+    root, ext = os.path.splitext(output_path)
+    df.to_parquet(output_path, engine='pyarrow', compression='zstd', index=False)
+    dept_df.to_parquet(f"{root}_departments{ext}", engine='pyarrow', compression='zstd', index=False)
+
+def parquet_output_path(output: str) -> str:
+    """Return the Parquet path used alongside (or instead of) the Excel output."""
+    return os.path.splitext(output)[0] + ".parquet"
+
+def run_merge(scopus_file: str, wos_file: str, output: str, output_format: str = "xlsx",
+              parallel: bool = False) -> Dict:
+    """
+    Merge and deduplicate the Scopus and WoS files and write the output.
+    
+    Args:
+        scopus_file: Path to the Scopus Excel file
+        wos_file: Path to the WoS Excel file
+        output: Path for the output Excel file
+        output_format: "xlsx", "parquet" or "both"; Parquet output is written
+            to parquet_output_path(output)
+        parallel: Parse the two inputs in separate worker processes. Only for
+            single-threaded callers such as the CLI; forking a multithreaded
+            process (e.g. the API server) can deadlock on locks held by other threads
+        
+    Returns:
+        Statistics about the generated data (see build_output_frames)
+        
+    Raises:
+        FileNotFoundError: If either input file does not exist
+        ValueError: If the inputs yield no publications to write
+    """
+    # Check if input files exist
+    if not os.path.exists(scopus_file):
+        raise FileNotFoundError(f"Scopus file not found: {scopus_file}")
+    
+    if not os.path.exists(wos_file):
+        raise FileNotFoundError(f"WoS file not found: {wos_file}")
+    
+    # Process both files
+    logger.info("Starting publication merge and deduplication process")
+    
+    if parallel:
+        # The files are independent, so parse them in parallel worker processes
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            scopus_future = executor.submit(process_excel_file, scopus_file, "scopus")
+            wos_future = executor.submit(process_excel_file, wos_file, "wos")
+            scopus_data = scopus_future.result()
+            wos_data = wos_future.result()
+    else:
+        scopus_data = process_excel_file(scopus_file, "scopus")
+        wos_data = process_excel_file(wos_file, "wos")
+    
+    if not scopus_data and not wos_data:
+        raise ValueError("No data found in either input file")
+    
+    # Merge the data
+    merged_data = merge_author_data(scopus_data, wos_data)
+    
+    if not merged_data:
+        raise ValueError("No merged data to output")
+    
+    # Generate output
+    df, dept_df, stats = build_output_frames(merged_data)
+    
+    if output_format in ("xlsx", "both"):
+        generate_output_excel(df, dept_df, output)
+    if output_format in ("parquet", "both"):
+        generate_output_parquet(df, dept_df, parquet_output_path(output))
+    
+    logger.info(f"Generated output with {stats['total_authors']} authors, {stats['total_publications']} unique publications, {stats['total_departments']} departments")
     return stats
 
 def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    
     parser = argparse.ArgumentParser(description="Merge and deduplicate publications from Scopus and WoS Excel files")
     parser.add_argument("--scopus-file", required=True, help="Path to Scopus Excel file")
     parser.add_argument("--wos-file", required=True, help="Path to WoS Excel file")
     parser.add_argument("--output", required=True, help="Path for output Excel file")
+    parser.add_argument("--format", choices=["xlsx", "parquet", "both"], default="xlsx",
+                        help="Output format; Parquet files are written next to --output with a .parquet extension")
     
     args = parser.parse_args()
     
     try:
-        # Check if input files exist
-        if not os.path.exists(args.scopus_file):
-            logger.error(f"Scopus file not found: {args.scopus_file}")
-            return
-        
-        if not os.path.exists(args.wos_file):
-            logger.error(f"WoS file not found: {args.wos_file}")
-            return
-        
-        # Process both files
-        logger.info("Starting publication merge and deduplication process")
-        
-        scopus_data = process_excel_file(args.scopus_file, "scopus")
-        wos_data = process_excel_file(args.wos_file, "wos")
-        
-        if not scopus_data and not wos_data:
-            logger.error("No data found in either input file")
-            return
-        
-        # Merge the data
-        merged_data = merge_author_data(scopus_data, wos_data)
-        
-        if not merged_data:
-            logger.error("No merged data to output")
-            return
-        
-        # Generate output
-        stats = generate_output_excel(merged_data, args.output)
-        
-        # Print summary
-        logger.info("✅ Publication merge completed successfully!")
-        logger.info(f"📊 Summary:")
-        logger.info(f"   - Total authors: {stats['total_authors']}")
-        logger.info(f"   - Total unique publications: {stats['total_publications']}")
-        logger.info(f"   - Total departments: {stats['total_departments']}")
-        logger.info(f"   - Average publications per author: {stats['avg_publications_per_author']}")
-        
-        logger.info(f"📁 Output saved to: {args.output}")
-        
+        stats = run_merge(args.scopus_file, args.wos_file, args.output, args.format, parallel=True)
+    except (FileNotFoundError, ValueError) as e:
+        logger.error(str(e))
+        return
     except Exception as e:
         logger.error(f"Error in main process: {e}")
         raise
+    
+    # Print summary
+    logger.info("✅ Publication merge completed successfully!")
+    logger.info(f"📊 Summary:")
+    logger.info(f"   - Total authors: {stats['total_authors']}")
+    logger.info(f"   - Total unique publications: {stats['total_publications']}")
+    logger.info(f"   - Total departments: {stats['total_departments']}")
+    logger.info(f"   - Average publications per author: {stats['avg_publications_per_author']}")
+    
+    if args.format in ("xlsx", "both"):
+        logger.info(f"📁 Output saved to: {args.output}")
+    if args.format in ("parquet", "both"):
+        logger.info(f"📁 Output saved to: {parquet_output_path(args.output)}")
+    
+    # Machine-readable summary as the final stdout line, for callers running the script
+    print(json.dumps({
+        "total_authors": stats['total_authors'],
+        "total_publications": stats['total_publications'],
+        "total_departments": stats['total_departments']
+    }))
 
 if __name__ == "__main__":
     main()
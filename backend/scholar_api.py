@@ -2,18 +2,120 @@
 Google Scholar API integration using SerpAPI.
 This module extracts citation metrics from Google Scholar profiles.
 """
+import logging
 import os
 import re
-from typing import Dict, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Union
+import orjson
+import requests
 from dotenv import load_dotenv
-from serpapi import GoogleSearch
+from lxml import etree, html as lxml_html
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from disk_cache import JsonTTLCache
+
+logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
 
 # API Configuration
 SERPAPI_KEY = os.getenv("SERPAPI_KEY", "")
+_HAS_SERPAPI = bool(SERPAPI_KEY)
+
+# Request parameters shared by every author lookup; each call only adds author_id
+SERPAPI_SEARCH_URL = "https://serpapi.com/search"
+_search_params_base = {
+    "engine": "google_scholar_author",
+    "api_key": SERPAPI_KEY,
+    "hl": "en",  # Language parameter
+    "output": "json"
+}
+
+# Scholar metrics change slowly, so lookups are cached per scholar ID on disk
+# (for a day by default) and repeat requests skip SerpAPI entirely
+SCHOLAR_CACHE_TTL = float(os.getenv("SCHOLAR_CACHE_TTL", 24 * 60 * 60))
+
+# Failed lookups (all-zero metrics) are cached briefly as well, so a failing
+# profile does not repeat the SerpAPI call and every fallback on each request
+SCHOLAR_FAILURE_TTL = float(os.getenv("SCHOLAR_FAILURE_TTL", 5 * 60))
+
+# Keyed by scholar ID, so it must not share a file with compute_scholar_metrics'
+# URL-keyed cache (each save rewrites the whole file)
+_metrics_cache = JsonTTLCache(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "serpapi_scholar_metrics.json"),
+    SCHOLAR_CACHE_TTL
+)
+
+# Cache key for the outcome of test_serpapi_connection (never a valid scholar ID)
+_CONNECTION_TEST_KEY = "__connection_test__"
+
+# Compiled patterns for metric row labels
+_CITATIONS_LABEL_RE = re.compile(r'citation|cited', re.IGNORECASE)
+_H_INDEX_LABEL_RE = re.compile(r'h[- ]index', re.IGNORECASE)
+_I10_INDEX_LABEL_RE = re.compile(r'i10[- ]index', re.IGNORECASE)
+
+# Metric keys of the SerpAPI cited_by table, in lookup order
+_METRIC_KEYS = ("citations", "h_index", "i10_index")
+
+# Compiled XPath selectors for the profile metrics table, most specific first
+_METRICS_TABLE_XPATHS = [
+    etree.XPath("//table[contains(concat(' ', normalize-space(@class), ' '), ' gsc_rsb_stats ')]"),
+    etree.XPath("//*[contains(concat(' ', normalize-space(@class), ' '), ' gsc_rsb_stats ')]"),
+    etree.XPath("//table[contains(@class, 'gsc')]"),
+    etree.XPath("//table"),
+]
+_ROWS_XPATH = etree.XPath(".//tr")
+_CELLS_XPATH = etree.XPath(".//td")
+_CITATION_ELEMENTS_XPATH = etree.XPath(
+    "//*[contains(@class, 'citation') or contains(@class, 'cited')"
+    " or contains(concat(' ', normalize-space(@class), ' '), ' gsc_rsb_c1 ')"
+    " or contains(concat(' ', normalize-space(@class), ' '), ' gsc_rsb_c2 ')]"
+)
+
+# Raw HTML dumps can run to megabytes but the stats table sits near the top, so
+# the download stops once the table has closed; a page still open at the size
+# cap is given up on rather than parsed partially. The marker is the table's id
+# attribute, since the bare class name also appears in inline CSS and scripts
+_RAW_HTML_CHUNK_SIZE = 16 * 1024
+_RAW_HTML_MAX_BYTES = 256 * 1024
+_STATS_TABLE_MARKER = b'id="gsc_rsb_st"'
+_TABLE_END_MARKER = b'</table>'
+
+# A profile page smaller than this, or carrying a CAPTCHA marker near the top,
+# is a block or interstitial page and is not worth parsing
+_MIN_PROFILE_PAGE_BYTES = 2 * 1024
+_CAPTCHA_SNIFF_BYTES = 2 * 1024
+_CAPTCHA_MARKER = b'gs_captcha'
 
+# Shared HTTP session so repeat fetches reuse pooled connections instead of
+# paying a new TCP/TLS handshake per request; it is safe to use across threads
+_POOL_MAXSIZE = 20
+_SESSION = requests.Session()
+_SESSION.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+})
+_ADAPTER = HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=_POOL_MAXSIZE,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 502, 503, 504])
+)
+_SESSION.mount("http://", _ADAPTER)
+_SESSION.mount("https://", _ADAPTER)
+
+# Every SerpAPI search is billed, so searches are retried only when rate limited
+# (honouring Retry-After), never on 5xx responses
+_SEARCH_ADAPTER = HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=_POOL_MAXSIZE,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429], respect_retry_after_header=True)
+)
+# The query-string prefix keeps free fetches such as /searches/<id>.html on _ADAPTER
+_SESSION.mount(SERPAPI_SEARCH_URL + "?", _SEARCH_ADAPTER)
+
+@lru_cache(maxsize=1024)
 def extract_scholar_id(url: str) -> Optional[str]:
     """
     Extract Google Scholar ID from URL.
@@ -24,17 +126,18 @@ def extract_scholar_id(url: str) -> Optional[str]:
     Returns:
         Scholar ID if found, None otherwise
     """
-    # Pattern for Google Scholar profile URLs
-    pattern = r'user=([^&]+)'
-    match = re.search(pattern, url)
-    
-    if match:
-        return match.group(1)
-    return None
+    # The ID is the value of the user= query parameter
+    _, sep, rest = url.partition("user=")
+    if not sep:
+        return None
+    scholar_id, _, _ = rest.partition("&")
+    return scholar_id or None
 
 def get_scholar_metrics(url: str) -> Dict:
     """
     Get Google Scholar metrics using SerpAPI.
+    Successful lookups are cached per scholar ID for SCHOLAR_CACHE_TTL seconds,
+    failed ones for SCHOLAR_FAILURE_TTL seconds.
     
     Args:
         url: Google Scholar profile URL
@@ -42,63 +145,120 @@ def get_scholar_metrics(url: str) -> Dict:
     Returns:
         Dictionary with citations, h-index, and i10-index
     """
-    if not SERPAPI_KEY:
-        print("WARNING: No SerpAPI key provided. Using fallback extraction.")
-        return _extract_metrics_directly(url)
+    metrics, fetched = _lookup_scholar_metrics(url)
+    if fetched:
+        _metrics_cache.save()
+    return metrics
+
+def _lookup_scholar_metrics(url: str) -> Tuple[Dict, bool]:
+    """
+    Return a profile's metrics from the cache, or fetch and cache them.
     
+    The cache is not written to disk; callers save it once they are done.
+    The flag is True when the metrics were fetched rather than cached.
+    """
     scholar_id = extract_scholar_id(url)
+    if scholar_id:
+        cached = _metrics_cache.get(scholar_id)
+        if cached is not None:
+            return dict(cached), False
+    
+    metrics = _fetch_scholar_metrics(url, scholar_id)
+    
+    # All-zero metrics are what failed lookups return, so those expire sooner
+    if scholar_id:
+        ttl = None if any(metrics.values()) else SCHOLAR_FAILURE_TTL
+        _metrics_cache.set(scholar_id, metrics, ttl=ttl)
+    
+    return metrics, scholar_id is not None
+
+def get_scholar_metrics_batch(urls: List[str], max_workers: int = 8) -> Dict[str, Dict]:
+    """
+    Get Google Scholar metrics for many profiles concurrently.
+    Lookups run on a thread pool sharing the module's HTTP session, so
+    max_workers is capped at the session's connection pool size. The metrics
+    cache is written to disk once, after the whole batch.
+    
+    Args:
+        urls: Google Scholar profile URLs
+        max_workers: Maximum number of concurrent lookups
+        
+    Returns:
+        Dictionary mapping each URL to its metrics. A lookup that raised gets
+        all-zero metrics plus an "error" key holding the exception message.
+    """
+    results = {}
+    
+    with ThreadPoolExecutor(max_workers=min(max_workers, _POOL_MAXSIZE)) as executor:
+        futures = {executor.submit(_lookup_scholar_metrics, url): url for url in dict.fromkeys(urls)}
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                results[url], _ = future.result()
+            except Exception as e:
+                # One failed profile should not abort the rest of the batch
+                logger.error("Error extracting metrics for %s: %s", url, e)
+                results[url] = {
+                    "citations": 0,
+                    "h_index": 0,
+                    "i10_index": 0,
+                    "error": str(e)
+                }
+    
+    _metrics_cache.save()
+    return results
+
+def _all(metrics: Dict, key: str) -> int:
+    """Return the all-time value of a SerpAPI cited_by table metric, or 0 if absent."""
+    value = metrics.get(key)
+    return int(value.get("all", 0)) if value else 0
+
+def _search_serpapi(params: Dict) -> Dict:
+    """
+    Run a SerpAPI search over the shared session and decode the JSON response.
+    
+    Error payloads (e.g. an invalid key) are returned as decoded, like the
+    serpapi client's get_dict().
+    """
+    response = _SESSION.get(SERPAPI_SEARCH_URL, params=params, timeout=20)
+    return orjson.loads(response.content)
+
+def _fetch_scholar_metrics(url: str, scholar_id: Optional[str]) -> Dict:
+    """
+    Fetch metrics for a profile from SerpAPI, falling back to the profile page.
+    """
+    if not _HAS_SERPAPI:
+        logger.warning("No SerpAPI key provided. Using fallback extraction.")
+        return _extract_metrics_directly(url)
+    
     if not scholar_id:
-        print(f"Could not extract Scholar ID from URL: {url}")
+        logger.warning("Could not extract Scholar ID from URL: %s", url)
         return _extract_metrics_directly(url)
     
     try:
         # Set up SerpAPI parameters for Google Scholar Author
-        params = {
-            "engine": "google_scholar_author",
-            "author_id": scholar_id,
-            "api_key": SERPAPI_KEY,
-            "hl": "en"  # Language parameter
-        }
+        params = {**_search_params_base, "author_id": scholar_id}
         
         # Execute search
-        print(f"Making SerpAPI request for author_id: {scholar_id}")
-        search = GoogleSearch(params)
-        results = search.get_dict()
+        logger.debug("Making SerpAPI request for author_id: %s", scholar_id)
+        results = _search_serpapi(params)
         
-        print(f"Full response keys: {list(results.keys())}")
+        logger.debug("Full response keys: %s", results.keys())
         
-        # Check if we have the raw HTML file URL for fallback
-        raw_html_url = results.get("search_metadata", {}).get("raw_html_file")
-        if raw_html_url:
-            print(f"Found raw HTML file: {raw_html_url}")
-            # Try to extract from the raw HTML
-            try:
-                import requests
-                response = requests.get(raw_html_url, timeout=10)
-                if response.status_code == 200:
-                    print(f"Successfully fetched raw HTML, length: {len(response.text)}")
-                    return _extract_metrics_from_html(response.text)
-            except Exception as e:
-                print(f"Error fetching raw HTML: {e}")
-        
-        # Check if the API call was successful
-        if not results or len(results) < 3:
-            print(f"API call may have failed. Response: {results}")
-            return _extract_metrics_directly(url)
-        
-        # Print the full response structure for debugging
-        print("Full response structure:")
-        for key, value in results.items():
-            if isinstance(value, dict):
-                print(f"  {key}: {list(value.keys()) if value else 'empty'}")
-            elif isinstance(value, list):
-                print(f"  {key}: list with {len(value)} items")
-            else:
-                print(f"  {key}: {value}")
+        # Log the full response structure for debugging
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Full response structure:")
+            for key, value in results.items():
+                if isinstance(value, dict):
+                    logger.debug("  %s: %s", key, list(value.keys()) if value else 'empty')
+                elif isinstance(value, list):
+                    logger.debug("  %s: list with %d items", key, len(value))
+                else:
+                    logger.debug("  %s: %s", key, value)
         
         # Extract metrics from the cited_by section
         cited_by = results.get("cited_by", {})
-        print(f"Cited by section: {cited_by}")
+        logger.debug("Cited by section: %s", cited_by)
         
         # Initialize metrics
         citations = 0
@@ -109,57 +269,86 @@ def get_scholar_metrics(url: str) -> Dict:
         # should have a table with metrics in the cited_by section
         if cited_by and "table" in cited_by:
             table = cited_by["table"]
-            print(f"Found table with {len(table) if isinstance(table, list) else 'dict'} items")
+            logger.debug("Found table with %s items", len(table) if isinstance(table, list) else 'dict')
             
             if isinstance(table, list):
-                # Table is a list of metric objects
+                # Table is a list of metric objects, each keyed by one metric name
+                found = {}
                 for item in table:
-                    print(f"Processing table item: {item}")
-                    if "citations" in item:
-                        citations = item["citations"].get("all", 0)
-                        print(f"Found citations: {citations}")
-                    elif "h_index" in item:
-                        h_index = item["h_index"].get("all", 0)
-                        print(f"Found h_index: {h_index}")
-                    elif "i10_index" in item:
-                        i10_index = item["i10_index"].get("all", 0)
-                        print(f"Found i10_index: {i10_index}")
+                    logger.debug("Processing table item: %s", item)
+                    for key in _METRIC_KEYS:
+                        if item.get(key) is not None:
+                            found[key] = _all(item, key)
+                            logger.debug("Found %s: %s", key, found[key])
+                            break
+                    if len(found) == len(_METRIC_KEYS):
+                        break
+                citations = found.get("citations", 0)
+                h_index = found.get("h_index", 0)
+                i10_index = found.get("i10_index", 0)
             elif isinstance(table, dict):
                 # Table is a dictionary with metric keys
-                print("Table is a dictionary, extracting values directly")
-                citations = table.get("citations", {}).get("all", 0)
-                h_index = table.get("h_index", {}).get("all", 0)
-                i10_index = table.get("i10_index", {}).get("all", 0)
+                logger.debug("Table is a dictionary, extracting values directly")
+                citations = _all(table, "citations")
+                h_index = _all(table, "h_index")
+                i10_index = _all(table, "i10_index")
+        
+        # Only fall back to the raw HTML page when the structured table had no metrics
+        if citations == 0 and h_index == 0 and i10_index == 0:
+            raw_html_url = results.get("search_metadata", {}).get("raw_html_file")
+            if raw_html_url:
+                logger.debug("Found raw HTML file: %s", raw_html_url)
+                # Try to extract from the raw HTML
+                try:
+                    raw_html = _fetch_raw_html(raw_html_url)
+                    if raw_html is not None:
+                        logger.debug("Successfully fetched raw HTML, length: %d", len(raw_html))
+                        return _extract_metrics_from_html(raw_html)
+                except Exception as e:
+                    logger.warning("Error fetching raw HTML: %s", e)
+        
+        # Check if the API call was successful
+        if not results or len(results) < 3:
+            logger.warning("API call may have failed. Response: %s", results)
+            return _extract_metrics_directly(url)
         
         # If we didn't get metrics from the table, try alternative locations
         if citations == 0 and h_index == 0 and i10_index == 0:
-            print("No metrics found in table, trying alternative extraction methods")
+            logger.debug("No metrics found in table, trying alternative extraction methods")
             
             # Try to get metrics from articles if available
             articles = results.get("articles", [])
             if articles:
-                print(f"Found {len(articles)} articles")
-                total_citations = sum(article.get("cited_by", {}).get("value", 0) for article in articles if article.get("cited_by"))
+                logger.debug("Found %d articles", len(articles))
+                # Total citations, i10-index and h-index in a single pass: citation
+                # counts are bucketed (capped at the article count) instead of sorted
+                article_count = len(articles)
+                buckets = [0] * (article_count + 1)
+                total_citations = 0
+                cited_10_times = 0
+                for article in articles:
+                    count = (article.get("cited_by") or {}).get("value") or 0
+                    total_citations += count
+                    cited_10_times += count >= 10
+                    buckets[min(count, article_count)] += 1
+                
                 if total_citations > 0:
-                    # Calculate h-index and i10-index from articles
-                    citation_counts = [article.get("cited_by", {}).get("value", 0) for article in articles if article.get("cited_by")]
-                    citation_counts.sort(reverse=True)
-                    
-                    # Calculate h-index
+                    # h-index is the largest h with at least h articles cited h or more times
                     h_index = 0
-                    for i, count in enumerate(citation_counts, 1):
-                        if count >= i:
-                            h_index = i
-                        else:
+                    cited_at_least = 0
+                    for h in range(article_count, 0, -1):
+                        cited_at_least += buckets[h]
+                        if cited_at_least >= h:
+                            h_index = h
                             break
                     
-                    # Calculate i10-index
-                    i10_index = sum(1 for count in citation_counts if count >= 10)
+                    # i10-index is the number of articles cited at least 10 times
+                    i10_index = cited_10_times
                     
                     citations = total_citations
-                    print(f"Calculated metrics from articles: citations={citations}, h_index={h_index}, i10_index={i10_index}")
+                    logger.debug("Calculated metrics from articles: citations=%s, h_index=%s, i10_index=%s", citations, h_index, i10_index)
         
-        print(f"Final extracted metrics: citations={citations}, h_index={h_index}, i10_index={i10_index}")
+        logger.debug("Final extracted metrics: citations=%s, h_index=%s, i10_index=%s", citations, h_index, i10_index)
         
         return {
             "citations": int(citations),
@@ -168,40 +357,62 @@ def get_scholar_metrics(url: str) -> Dict:
         }
         
     except Exception as e:
-        print(f"Error extracting metrics from SerpAPI: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error extracting metrics from SerpAPI: %s", e)
         return _extract_metrics_directly(url)
 
-def _extract_metrics_from_html(html_content: str) -> Dict:
+def _fetch_raw_html(url: str) -> Optional[bytes]:
+    """
+    Stream an HTML page up to the end of its stats table.
+    
+    Returns the raw bytes read up to the table's end (or the whole page if it
+    ends first), or None if the request did not succeed or the size cap was
+    reached before the table closed. The bytes go to lxml undecoded.
+    """
+    with _SESSION.get(url, stream=True, timeout=10) as response:
+        if response.status_code != 200:
+            return None
+        
+        buf = bytearray()
+        table_start = -1
+        for chunk in response.iter_content(chunk_size=_RAW_HTML_CHUNK_SIZE):
+            # Rescan a marker's length of overlap in case it straddles chunks
+            scan_from = max(len(buf) - len(_STATS_TABLE_MARKER), 0)
+            buf += chunk
+            if table_start < 0:
+                table_start = buf.find(_STATS_TABLE_MARKER, scan_from)
+                scan_from = table_start
+            if table_start >= 0 and buf.find(_TABLE_END_MARKER, scan_from) >= 0:
+                break
+            if len(buf) >= _RAW_HTML_MAX_BYTES:
+                logger.warning("Raw HTML exceeded %d bytes before the stats table closed: %s", _RAW_HTML_MAX_BYTES, url)
+                return None
+        return bytes(buf)
+
+def _extract_metrics_from_html(html_content: Union[str, bytes]) -> Dict:
     """
     Extract metrics from HTML content
     """
     try:
-        from bs4 import BeautifulSoup
+        tree = lxml_html.fromstring(html_content)
         
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        print(f"HTML content length: {len(html_content)}")
-        print(f"Looking for metrics table...")
+        logger.debug("HTML content length: %d", len(html_content))
+        logger.debug("Looking for metrics table...")
         
         # Look for the metrics table - try multiple selectors
-        metrics_table = soup.select('table.gsc_rsb_stats')
-        if not metrics_table:
-            metrics_table = soup.select('.gsc_rsb_stats')
-        if not metrics_table:
-            metrics_table = soup.select('table[class*="gsc"]')
-        if not metrics_table:
-            metrics_table = soup.select('table')
+        metrics_table = []
+        for table_xpath in _METRICS_TABLE_XPATHS:
+            metrics_table = table_xpath(tree)
+            if metrics_table:
+                break
         
-        print(f"Found {len(metrics_table)} potential metrics tables")
+        logger.debug("Found %d potential metrics tables", len(metrics_table))
         
         for i, table in enumerate(metrics_table):
-            print(f"Examining table {i+1}: {table.get('class', 'no-class')}")
+            logger.debug("Examining table %d: %s", i + 1, table.get('class', 'no-class'))
             
             # Look for rows with citation metrics
-            rows = table.select('tr')
-            print(f"Table {i+1} has {len(rows)} rows")
+            rows = _ROWS_XPATH(table)
+            logger.debug("Table %d has %d rows", i + 1, len(rows))
             
             if len(rows) >= 3:
                 # Initialize metrics for this table
@@ -211,44 +422,44 @@ def _extract_metrics_from_html(html_content: str) -> Dict:
                 
                 # Try to extract metrics from different positions
                 for row_idx, row in enumerate(rows):
-                    cells = row.select('td')
+                    cells = _CELLS_XPATH(row)
                     if len(cells) >= 2:
-                        cell_text = [cell.get_text(strip=True) for cell in cells]
-                        print(f"Row {row_idx}: {cell_text}")
+                        cell_text = [cell.text_content().strip() for cell in cells]
+                        logger.debug("Row %d: %s", row_idx, cell_text)
                         
                         # Look for citation-related text
-                        if any(keyword in ' '.join(cell_text).lower() for keyword in ['citation', 'cited']):
+                        if _CITATIONS_LABEL_RE.search(' '.join(cell_text)):
                             try:
                                 # Try to extract the number from the second column (index 1)
-                                citations = int(cells[1].get_text(strip=True))
-                                print(f"Found citations: {citations}")
+                                citations = int(cell_text[1])
+                                logger.debug("Found citations: %s", citations)
                                 break
                             except (ValueError, IndexError):
                                 continue
                 
                 # Now look for h-index and i10-index
                 for row in rows:
-                    row_text = row.get_text().lower()
-                    if 'h-index' in row_text or 'h index' in row_text:
+                    row_text = row.text_content()
+                    if _H_INDEX_LABEL_RE.search(row_text):
                         try:
-                            cells = row.select('td')
+                            cells = _CELLS_XPATH(row)
                             if len(cells) >= 2:
-                                h_index = int(cells[1].get_text(strip=True))
-                                print(f"Found h-index: {h_index}")
+                                h_index = int(cells[1].text_content().strip())
+                                logger.debug("Found h-index: %s", h_index)
                         except (ValueError, IndexError):
                             pass
-                    elif 'i10-index' in row_text or 'i10 index' in row_text:
+                    elif _I10_INDEX_LABEL_RE.search(row_text):
                         try:
-                            cells = row.select('td')
+                            cells = _CELLS_XPATH(row)
                             if len(cells) >= 2:
-                                i10_index = int(cells[1].get_text(strip=True))
-                                print(f"Found i10-index: {i10_index}")
+                                i10_index = int(cells[1].text_content().strip())
+                                logger.debug("Found i10-index: %s", i10_index)
                         except (ValueError, IndexError):
                             pass
                 
                 # If we found any metrics, return them
                 if citations > 0 or h_index > 0 or i10_index > 0:
-                    print(f"HTML extraction successful: citations={citations}, h_index={h_index}, i10_index={i10_index}")
+                    logger.debug("HTML extraction successful: citations=%s, h_index=%s, i10_index=%s", citations, h_index, i10_index)
                     return {
                         "citations": citations,
                         "h_index": h_index,
@@ -256,22 +467,20 @@ def _extract_metrics_from_html(html_content: str) -> Dict:
                     }
         
         # If no metrics found in tables, try to find them in other elements
-        print("No metrics found in tables, trying alternative selectors...")
+        logger.debug("No metrics found in tables, trying alternative selectors...")
         
-        # Look for citation numbers in various elements
-        citation_elements = soup.select('[class*="citation"], [class*="cited"], .gsc_rsb_c1, .gsc_rsb_c2')
-        if citation_elements:
-            print(f"Found {len(citation_elements)} potential citation elements")
-            for elem in citation_elements:
-                text = elem.get_text(strip=True)
-                print(f"Citation element text: {text}")
+        # Look for citation numbers in various elements (diagnostics only)
+        if logger.isEnabledFor(logging.DEBUG):
+            citation_elements = _CITATION_ELEMENTS_XPATH(tree)
+            if citation_elements:
+                logger.debug("Found %d potential citation elements", len(citation_elements))
+                for elem in citation_elements:
+                    logger.debug("Citation element text: %s", elem.text_content().strip())
         
-        print("HTML extraction failed - metrics table not found")
+        logger.warning("HTML extraction failed - metrics table not found")
         
     except Exception as e:
-        print(f"Error during HTML extraction: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error during HTML extraction: %s", e)
     
     return {
         "citations": 0,
@@ -279,29 +488,43 @@ def _extract_metrics_from_html(html_content: str) -> Dict:
         "i10_index": 0
     }
 
+def _unusable_profile_page(response: requests.Response) -> Optional[str]:
+    """
+    Check a fetched profile page before parsing it.
+    
+    Returns:
+        Why the page cannot contain metrics (CAPTCHA, non-HTML or truncated
+        response), or None if it looks like a profile page
+    """
+    content_type = response.headers.get("Content-Type", "")
+    if content_type and not content_type.startswith("text/html"):
+        return f"unexpected content type {content_type}"
+    if "captcha" in response.url.lower() or _CAPTCHA_MARKER in response.content[:_CAPTCHA_SNIFF_BYTES]:
+        return "CAPTCHA page"
+    if len(response.content) < _MIN_PROFILE_PAGE_BYTES:
+        return f"page too small ({len(response.content)} bytes)"
+    return None
+
 def _extract_metrics_directly(url: str) -> Dict:
     """
     Fallback method to extract metrics directly from Google Scholar page
     """
     try:
-        import requests
-        from bs4 import BeautifulSoup
+        logger.debug("Attempting direct extraction from URL: %s", url)
         
-        print(f"Attempting direct extraction from URL: {url}")
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        # Try to access the URL directly
-        response = requests.get(url, headers=headers, timeout=15)
+        # Try to access the URL directly (the session sends a browser User-Agent)
+        response = _SESSION.get(url, timeout=15)
         
         if response.status_code == 200:
-            return _extract_metrics_from_html(response.text)
+            reason = _unusable_profile_page(response)
+            if reason is None:
+                return _extract_metrics_from_html(response.content)
+            logger.warning("Direct extraction failed - %s", reason)
         else:
-            print(f"Direct extraction failed - HTTP {response.status_code}")
+            logger.warning("Direct extraction failed - HTTP %s", response.status_code)
             
     except Exception as e:
-        print(f"Error during direct extraction: {e}")
+        logger.error("Error during direct extraction: %s", e)
     
     return {
         "citations": 0,
@@ -311,32 +534,43 @@ def _extract_metrics_directly(url: str) -> Dict:
 
         
 def test_serpapi_connection() -> bool:
-    """Test the connection to SerpAPI."""
-    if not SERPAPI_KEY:
-        print("No SerpAPI key found in environment variables.")
+    """
+    Test the connection to SerpAPI.
+    
+    The outcome is cached like a metrics lookup (SCHOLAR_CACHE_TTL on success,
+    SCHOLAR_FAILURE_TTL on failure) so repeated checks do not spend API credits.
+    """
+    if not _HAS_SERPAPI:
+        logger.warning("No SerpAPI key found in environment variables.")
         return False
+    
+    cached = _metrics_cache.get(_CONNECTION_TEST_KEY)
+    if cached is not None:
+        logger.debug("Using cached SerpAPI connection test result: %s", cached)
+        return cached
         
     try:
         # Simple test query with a known scholar
-        params = {
-            "engine": "google_scholar_author",
-            "author_id": "DAcGr9AAAAAJ",  # Example ID (Andrew Ng)
-            "api_key": SERPAPI_KEY
-        }
+        params = {**_search_params_base, "author_id": "DAcGr9AAAAAJ"}  # Example ID (Andrew Ng)
         
-        search = GoogleSearch(params)
-        results = search.get_dict()
+        results = _search_serpapi(params)
         
         if "author" in results:
-            print("Successfully connected to SerpAPI for Google Scholar.")
-            return True
+            logger.info("Successfully connected to SerpAPI for Google Scholar.")
+            connected = True
         else:
-            print("Failed to retrieve author data from SerpAPI.")
-            return False
+            logger.warning("Failed to retrieve author data from SerpAPI.")
+            connected = False
     except Exception as e:
-        print(f"Error connecting to SerpAPI: {e}")
-        return False
+        logger.error("Error connecting to SerpAPI: %s", e)
+        connected = False
+    
+    _metrics_cache.set(_CONNECTION_TEST_KEY, connected, ttl=None if connected else SCHOLAR_FAILURE_TTL)
+    _metrics_cache.save()
+    return connected
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    
     # Test the API connection
     test_serpapi_connection()